@@ -1,8 +1,19 @@
+import hashlib
+import sqlite3
+import struct
+import time
+from statistics import NormalDist
+
 import streamlit as st
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import plotly.express as px
-import plotly.graph_objects as go
+
+from dashboard_data import find_output, read_csv, read_snapshot, read_uploaded_csv
+# importable once dashboard_data has put mapreduce/ on sys.path
+from word_index import WordIndex
+from word_matrix import WordMatrix
 
 st.set_page_config(
     page_title="Tokopedia Reviews Insight Dashboard",
@@ -20,11 +31,163 @@ DEFAULT_FILES = {
     "Category Count": OUTPUT_DIR / "category_count.csv",
     "Avg Rating Category": OUTPUT_DIR / "avg_rating_category.csv",
     "Problem Products": OUTPUT_DIR / "problem_products.csv",
+    "Negative Bigrams": OUTPUT_DIR / "negative_bigrams.csv",
+}
+# Outputs of optional jobs; absent at their default path is not an error
+OPTIONAL_SOURCES = {"Negative Bigrams"}
+
+# Sources each page actually reads; only these are loaded on a rerun
+PAGE_SOURCES = {
+    "Overview": ["Word Count", "Category Count", "Avg Rating Category", "Problem Products"],
+    "Word Insights": ["Word Count"],
+    "Sentiment": ["Positive Words", "Negative Words", "Negative Bigrams"],
+    "Category Performance": ["Category Count", "Avg Rating Category"],
+    "Problem Products": ["Problem Products"],
+    "Explore Full Data": [],
+    "Settings / Data Loader": list(DEFAULT_FILES),
+}
+
+# Full, untruncated counts written by the reducers with SQLITE_DB set
+STORE_PATH = OUTPUT_DIR / "aggregates.sqlite"
+STORE_TABLES = {
+    "Word Count": ("wordcount", "word", "count"),
+    "Positive Words": ("positive_words", "word", "count"),
+    "Negative Words": ("negative_words", "word", "count"),
+    "Category Count": ("category_count", "category", "review_count"),
+    "Problem Products": ("problem_products", "product_name", "negative_review_count"),
 }
+PREFIX_END = "\U0010ffff"
+
+# One consistent, typed bundle of all tables, published atomically by the
+# pipeline (mapreduce/snapshot.py); used for every source left at its default
+SNAPSHOT_PATH = OUTPUT_DIR / "snapshot.json"
+SNAPSHOT_TABLES = {
+    "Word Count": "wordcount",
+    "Positive Words": "positive_words",
+    "Negative Words": "negative_words",
+    "Category Count": "category_count",
+    "Avg Rating Category": "avg_rating_category",
+    "Problem Products": "problem_products",
+    "Negative Bigrams": "negative_bigrams",
+}
+
+# Complaint word -> top products index (mapreduce/word_index.py);
+# memory-mapped and binary-searched per lookup, never read whole
+WORD_INDEX_PATH = OUTPUT_DIR / "word_products.idx"
+
+# Per-category word matrix (mapreduce/word_matrix.py): CSR rows are
+# (category, rating) pairs and columns words, so any category / rating filter
+# is a row mask
+WORD_MATRIX_PATH = OUTPUT_DIR / "category_words.wcm"
+SENTIMENT_RATINGS = {"Semua": (1, 5), "Positif (≥ 4)": (4, 5), "Negatif (≤ 2)": (1, 2)}
+# total weight of the corpus-frequency Dirichlet prior in the log-odds scores
+LOG_ODDS_PRIOR = 500.0
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def load_csv(path: str, mtime_ns: int, size: int) -> pd.DataFrame:
+    # mtime/size are part of the cache key so files regenerated by the
+    # pipeline are re-read instead of served stale
+    return read_csv(path)
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_snapshot(path: str, mtime_ns: int, size: int):
+    return read_snapshot(path)
+
+def current_snapshot():
+    if not SNAPSHOT_PATH.exists():
+        return None
+    stat = SNAPSHOT_PATH.stat()
+    try:
+        return load_snapshot(str(SNAPSHOT_PATH), stat.st_mtime_ns, stat.st_size)
+    except (OSError, ValueError, KeyError):
+        return None
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def load_uploaded_csv(digest: str, _data: bytes) -> pd.DataFrame:
+    # keyed by content hash; the bytes themselves are not hashed by streamlit
+    return read_uploaded_csv(_data)
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def query_store(path: str, mtime_ns: int, table: str, prefix: str, limit: int, offset: int):
+    """One page of `table` ordered by count, optionally restricted to keys
+    starting with `prefix` (a range scan on the key index)."""
+    con = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        where, params = "", ()
+        if prefix:
+            where, params = "WHERE key >= ? AND key < ?", (prefix, prefix + PREFIX_END)
+        total = con.execute(f"SELECT COUNT(*) FROM {table} {where}", params).fetchone()[0]
+        rows = con.execute(
+            f"SELECT key, count FROM {table} {where} ORDER BY count DESC, key LIMIT ? OFFSET ?",
+            params + (limit, offset),
+        ).fetchall()
+    finally:
+        con.close()
+    return total, rows
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def open_word_index(path: str, mtime_ns: int):
+    return WordIndex(path)
+
+def word_products(word: str):
+    """(total low-rated reviews, [(product, count), ...]) for a word, or None
+    without a usable index."""
+    try:
+        index = open_word_index(str(WORD_INDEX_PATH), WORD_INDEX_PATH.stat().st_mtime_ns)
+    except (OSError, ValueError, struct.error):
+        return None
+    return index.lookup(word)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_word_matrix(path: str, mtime_ns: int):
+    return WordMatrix(path)
+
+def current_word_matrix():
+    if not WORD_MATRIX_PATH.exists():
+        return None
+    try:
+        return load_word_matrix(str(WORD_MATRIX_PATH), WORD_MATRIX_PATH.stat().st_mtime_ns)
+    except (OSError, ValueError):
+        return None
 
-@st.cache_data(show_spinner=False)
-def load_csv(path: str) -> pd.DataFrame:
-    return pd.read_csv(path)
+def category_words(m: WordMatrix, category, ratings, topn: int):
+    """Top words of a category (None: all) within a rating range, and for a
+    category its most distinctive words against the other categories:
+    log-odds ratio z-scores with an informative Dirichlet prior (Monroe et al.)."""
+    lo, hi = ratings
+    in_range = (m.row_rating >= lo) & (m.row_rating <= hi)
+    rows = in_range
+    if category is not None:
+        in_cat = m.row_category == m.categories.index(category)
+        rows = in_range & in_cat
+    y = m.word_counts(rows)
+    top = np.argsort(-y, kind="stable")[:topn]
+    top = top[y[top] > 0]
+    df_top = pd.DataFrame({"word": m.words(top), "count": y[top]})
+    if category is None:
+        return df_top, None
+
+    rest = m.word_counts(in_range & ~in_cat)
+    bg = y + rest
+    seen = bg > 0
+    alpha = LOG_ODDS_PRIOR * bg / max(bg.sum(), 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        delta = (np.log((y + alpha) / (y.sum() + LOG_ODDS_PRIOR - y - alpha))
+                 - np.log((rest + alpha) / (rest.sum() + LOG_ODDS_PRIOR - rest - alpha)))
+        z = delta / np.sqrt(1 / (y + alpha) + 1 / (rest + alpha))
+    z = np.where(seen & (y > 0), z, -np.inf)
+    best = np.argsort(-z, kind="stable")[:topn]
+    best = best[np.isfinite(z[best])]
+    df_dist = pd.DataFrame({"word": m.words(best), "log_odds_z": z[best].round(2),
+                            "count": y[best]})
+    return df_top, df_dist
+
+def store_tables(path: Path):
+    con = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return {r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    finally:
+        con.close()
 
 def insight_box(title: str, points: list[str], kind: str = "info"):
     """
@@ -85,27 +248,111 @@ def show_kpis(df_word=None, df_cat=None, df_avg=None):
             f"(avg **{best['avg_rating']:.2f}**, reviews **{int(best['review_count']):,}**)"
         )
 
-def bar_chart(df: pd.DataFrame, x_col: str, y_col: str, title: str, topn: int = 20, color_scheme="blues"):
-    if df is None or df.empty:
-        st.warning("Data is empty / not loaded.")
-        return
-    d = df.copy().head(topn)
-    st.subheader(title)
-    
-    # Create Plotly horizontal bar chart for better readability
+# ---------- Charts ----------
+# Figures are built once per (dataset fingerprint, chart kind, topn) and
+# reused across reruns. Bars use one colour and a texttemplate over x so the
+# figure JSON carries no duplicated color/text arrays.
+BAR_COLORS = {
+    "blues": "#2a5298",
+    "purples": "#6a51a3",
+    "greens": "#238b45",
+    "reds": "#cb181d",
+}
+FIGURE_CACHE_ENTRIES = 32
+
+def build_bar(d: pd.DataFrame, topn: int, x_col: str, y_col: str, color_scheme: str, value_format: str = ",.0f", range_x=None):
     fig = px.bar(d, x=y_col, y=x_col, orientation='h',
                  labels={x_col: x_col.replace('_', ' ').title(), y_col: y_col.replace('_', ' ').title()},
-                 color=y_col, color_continuous_scale=color_scheme,
-                 text=y_col)
-    
-    fig.update_traces(texttemplate='%{text:,.0f}', textposition='outside')
+                 range_x=range_x)
+    fig.update_traces(
+        marker_color=BAR_COLORS.get(color_scheme, BAR_COLORS["blues"]),
+        texttemplate=f"%{{x:{value_format}}}",
+        textposition='outside',
+    )
+    if "error" in d.columns:
+        # approximate counts are upper bounds; the true value is at most
+        # `error` lower
+        fig.update_traces(error_x=dict(type="data", symmetric=False, array=[0] * len(d), arrayminus=d["error"].tolist()))
+    elif {"ci_low", "ci_high"}.issubset(d.columns):
+        # preview estimates: confidence interval around the bar
+        fig.update_traces(error_x=dict(
+            type="data", symmetric=False,
+            array=(d["ci_high"] - d[y_col]).fillna(0).tolist(),
+            arrayminus=(d[y_col] - d["ci_low"]).fillna(0).tolist(),
+        ))
     fig.update_layout(
         height=max(400, topn * 20),
         yaxis={'categoryorder':'total ascending'},
         showlegend=False,
         margin=dict(l=20, r=20, t=40, b=20)
     )
+    return fig
+
+def build_avg_rating(d: pd.DataFrame, topn: int):
+    fig = build_bar(d, topn, "category", "avg_rating", "greens", value_format=".2f", range_x=[0, 5])
+    fig.update_layout(xaxis_title="Average Rating", yaxis_title="Category")
+    return fig
+
+def build_opportunity(m: pd.DataFrame, topn: int):
+    fig = px.scatter(m, x="review_count", y="avg_rating",
+                     hover_name="category",
+                     size="review_count",
+                     labels={"review_count": "Review Volume", "avg_rating": "Avg Rating"},
+                     range_y=[0, 5])
+    fig.update_traces(marker_color=BAR_COLORS["blues"], hovertemplate="%{hovertext}<br>Review Volume=%{x:,}<br>Avg Rating=%{y:.2f}<extra></extra>")
+    fig.update_layout(height=500, showlegend=False)
+    fig.add_hline(y=3.5, line_dash="dash", line_color="gray", annotation_text="Quality Threshold")
+    fig.add_vline(x=m["review_count"].median(), line_dash="dash", line_color="gray", annotation_text="Volume Median")
+    return fig
+
+FIGURE_BUILDERS = {
+    "bar": build_bar,
+    "avg_rating": build_avg_rating,
+    "opportunity": build_opportunity,
+}
+
+@st.cache_resource(show_spinner=False, max_entries=FIGURE_CACHE_ENTRIES)
+def cached_figure(fingerprint: str, kind: str, topn: int, _d: pd.DataFrame, **opts):
+    return FIGURE_BUILDERS[kind](_d, topn, **opts)
+
+def figure(df: pd.DataFrame, kind: str, topn: int, d: pd.DataFrame, **opts):
+    # `d` is the slice actually plotted, derived from `df`; the fingerprint of
+    # `df` plus kind/topn/opts identifies it. Unfingerprinted data is not cached.
+    fingerprint = df.attrs.get("fingerprint")
+    if not fingerprint:
+        return FIGURE_BUILDERS[kind](d, topn, **opts)
+    return cached_figure(fingerprint, kind, topn, d, **opts)
+
+def bar_chart(df: pd.DataFrame, x_col: str, y_col: str, title: str, topn: int = 20, color_scheme="blues", key=None, selectable=False, value_format=",.0f"):
+    """With selectable (and a key), bars are clickable and the clicked x_col
+    value is returned (None when nothing is selected)."""
+    if df is None or df.empty:
+        st.warning("Data is empty / not loaded.")
+        return None
+    d = df.head(topn)
+    st.subheader(title)
+    fig = figure(df, "bar", topn, d, x_col=x_col, y_col=y_col, color_scheme=color_scheme, value_format=value_format)
+    selected = None
+    if selectable:
+        event = st.plotly_chart(fig, use_container_width=True, on_select="rerun", selection_mode="points", key=key)
+        points = event.selection.points if event else []
+        selected = points[0]["y"] if points else None
+    else:
+        st.plotly_chart(fig, use_container_width=True, key=key)
+    if "error" in d.columns:
+        st.caption("≈ Hitungan aproksimasi (Space-Saving): nilai sebenarnya di antara count − error dan count")
+    elif "ci_low" in d.columns:
+        st.caption("Preview: count adalah estimasi dari sampel; error bar = interval kepercayaan")
+    return selected
+
+def avg_rating_chart(df_avg: pd.DataFrame, topn: int):
+    # shared by Overview and Category Performance; returns the plotted rows
+    d = df_avg.sort_values("avg_rating", ascending=False).head(topn)
+    fig = figure(df_avg, "avg_rating", topn, d)
     st.plotly_chart(fig, use_container_width=True)
+    if "ci_low" in d.columns:
+        st.caption("Preview: rata-rata dari sampel; error bar = interval kepercayaan")
+    return d
 
 def dataframe_with_download(df: pd.DataFrame, filename: str):
     st.dataframe(df, use_container_width=True, height=420)
@@ -122,7 +369,7 @@ def resolve_file(label: str, default_path: Path):
     use_upload = st.checkbox(f"Upload file for {label}", key=f"up_{label}", value=False)
 
     if use_upload:
-        up = st.file_uploader(f"Upload {label} CSV", type=["csv"], key=f"uploader_{label}")
+        up = st.file_uploader(f"Upload {label} CSV", type=["csv", "gz", "bz2", "xz"], key=f"uploader_{label}")
         if up is not None:
             return up
         return None
@@ -135,19 +382,26 @@ def resolve_file(label: str, default_path: Path):
         return path_str
 
 def safe_load(source):
+    """Returns (df, error, fingerprint); the fingerprint identifies the data
+    version and keys the figure cache."""
     if source is None:
-        return None, "No source selected."
+        return None, "No source selected.", None
     try:
         if hasattr(source, "read"):  # uploaded file
-            df = pd.read_csv(source)
+            data = source.getvalue()
+            digest = hashlib.sha1(data).hexdigest()
+            df = load_uploaded_csv(digest, data)
+            fingerprint = f"upload:{digest}"
         else:
-            p = Path(str(source))
-            if not p.exists():
-                return None, f"File not found: {p}"
-            df = load_csv(str(p))
-        return df, None
+            p = find_output(Path(str(source)))
+            if p is None:
+                return None, f"File not found: {source}", None
+            stat = p.stat()
+            df = load_csv(str(p), stat.st_mtime_ns, stat.st_size)
+            fingerprint = f"file:{p.resolve()}:{stat.st_mtime_ns}:{stat.st_size}"
+        return df, None, fingerprint
     except Exception as e:
-        return None, str(e)
+        return None, str(e), None
 
 def normalize_two_cols(df: pd.DataFrame, cols=("key", "value")):
     # For outputs like: word,count OR category,review_count OR product_name,negative_review_count
@@ -157,6 +411,70 @@ def normalize_two_cols(df: pd.DataFrame, cols=("key", "value")):
         df = df.rename(columns={df.columns[0]: cols[0], df.columns[1]: cols[1]})
     return df
 
+def normalize_avg(df: pd.DataFrame):
+    # avg rating expected columns: category,avg_rating,review_count
+    if df is None or df.empty:
+        return df
+    col_map = {}
+    if "category" not in df.columns and len(df.columns) >= 1:
+        col_map[df.columns[0]] = "category"
+    if "avg_rating" not in df.columns and len(df.columns) >= 2:
+        col_map[df.columns[1]] = "avg_rating"
+    if "review_count" not in df.columns and len(df.columns) >= 3:
+        col_map[df.columns[2]] = "review_count"
+    df = df.rename(columns=col_map)
+
+    for c in ["avg_rating", "review_count", "ci_low", "ci_high"]:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+    return df
+
+SOURCE_COLUMNS = {
+    "Word Count": ("word", "count"),
+    "Positive Words": ("word", "count"),
+    "Negative Words": ("word", "count"),
+    "Category Count": ("category", "review_count"),
+    "Problem Products": ("product_name", "negative_review_count"),
+    "Negative Bigrams": ("phrase", "count"),
+}
+
+def add_count_interval(df: pd.DataFrame, col: str, sample: dict):
+    # a Bernoulli sample at rate p estimates a count N as n / p, with variance
+    # N (1 - p) / p; normal-approximation interval at the run's confidence
+    p = sample["rate"]
+    z = NormalDist().inv_cdf((1 + sample["confidence"]) / 2)
+    half = z * (df[col] * (1 - p) / p) ** 0.5
+    df["ci_low"] = (df[col] - half).clip(lower=0)
+    df["ci_high"] = df[col] + half
+    return df
+
+def load_source(label: str, source, snapshot=None):
+    table = SNAPSHOT_TABLES.get(label)
+    sample = None
+    default = isinstance(source, str) and source == str(DEFAULT_FILES[label])
+    if default and label in OPTIONAL_SOURCES and find_output(DEFAULT_FILES[label]) is None \
+            and not (snapshot and table in snapshot[1]):
+        return None, None
+    if snapshot and default and table in snapshot[1]:
+        df, err = snapshot[1][table].copy(deep=False), None
+        fingerprint = f"snapshot:{snapshot[0]['version']}:{table}"
+        sample = snapshot[0]["sample"]
+    else:
+        df, err, fingerprint = safe_load(source)
+    if label in SOURCE_COLUMNS:
+        df = normalize_two_cols(df, SOURCE_COLUMNS[label])
+        if df is not None and len(df.columns) >= 3:
+            # optional third column from APPROX_ERROR_COLUMN=1 reducers
+            df = df.rename(columns={df.columns[2]: "error"})
+            df["error"] = pd.to_numeric(df["error"], errors="coerce")
+        if sample and label == "Category Count" and df is not None and not df.empty:
+            df = add_count_interval(df.copy(), "review_count", sample)
+    else:
+        df = normalize_avg(df)
+    if df is not None:
+        df.attrs["fingerprint"] = fingerprint
+    return df, err
+
 # ---------- Sidebar ----------
 # Custom CSS for button-style menu
 st.markdown("""
@@ -228,6 +546,7 @@ menu_options = [
     "Sentiment",
     "Category Performance",
     "Problem Products",
+    "Explore Full Data",
     "Settings / Data Loader",
 ]
 
@@ -247,56 +566,64 @@ topn = st.sidebar.slider("Top-N to Display", min_value=10, max_value=100, value=
 st.title("Tokopedia Reviews Insight Dashboard")
 
 with st.expander("Data Sources (click to configure)", expanded=(menu == "Settings / Data Loader")):
-    src_word = resolve_file("Word Count", DEFAULT_FILES["Word Count"])
-    src_pos  = resolve_file("Positive Words", DEFAULT_FILES["Positive Words"])
-    src_neg  = resolve_file("Negative Words", DEFAULT_FILES["Negative Words"])
-    src_cat  = resolve_file("Category Count", DEFAULT_FILES["Category Count"])
-    src_avg  = resolve_file("Avg Rating Category", DEFAULT_FILES["Avg Rating Category"])
-    src_prob = resolve_file("Problem Products", DEFAULT_FILES["Problem Products"])
-
-# Load data
-df_word, err_word = safe_load(src_word)
-df_pos,  err_pos  = safe_load(src_pos)
-df_neg,  err_neg  = safe_load(src_neg)
-df_cat,  err_cat  = safe_load(src_cat)
-df_avg,  err_avg  = safe_load(src_avg)
-df_prob, err_prob = safe_load(src_prob)
-
-# ---------- Validate / Normalize Columns ----------
-df_word = normalize_two_cols(df_word, ("word", "count"))
-df_pos  = normalize_two_cols(df_pos,  ("word", "count"))
-df_neg  = normalize_two_cols(df_neg,  ("word", "count"))
-df_cat  = normalize_two_cols(df_cat,  ("category", "review_count"))
-df_prob = normalize_two_cols(df_prob, ("product_name", "negative_review_count"))
-
-# avg rating expected columns: category,avg_rating,review_count
-if df_avg is not None and not df_avg.empty:
-    col_map = {}
-    if "category" not in df_avg.columns and len(df_avg.columns) >= 1:
-        col_map[df_avg.columns[0]] = "category"
-    if "avg_rating" not in df_avg.columns and len(df_avg.columns) >= 2:
-        col_map[df_avg.columns[1]] = "avg_rating"
-    if "review_count" not in df_avg.columns and len(df_avg.columns) >= 3:
-        col_map[df_avg.columns[2]] = "review_count"
-    df_avg = df_avg.rename(columns=col_map)
-
-    for c in ["avg_rating", "review_count"]:
-        if c in df_avg.columns:
-            df_avg[c] = pd.to_numeric(df_avg[c], errors="coerce")
+    sources = {label: resolve_file(label, path) for label, path in DEFAULT_FILES.items()}
+
+# Load only what the active page needs; every table of one rerun comes from
+# the same snapshot version. A CSV newer than the snapshot means a job was
+# rerun on its own, so then every table is read from the CSV files instead.
+snapshot = current_snapshot()
+newer = []
+if snapshot:
+    snapshot_mtime = SNAPSHOT_PATH.stat().st_mtime_ns
+    newer = [
+        p.name for p in (find_output(path) for path in DEFAULT_FILES.values())
+        if p is not None and p.stat().st_mtime_ns > snapshot_mtime
+    ]
+if newer:
+    st.sidebar.warning(
+        f"{', '.join(newer)} lebih baru dari snapshot {snapshot[0]['version']}; "
+        "membaca file CSV. Jalankan `python mapreduce/snapshot.py` untuk memperbarui."
+    )
+    snapshot = None
+elif snapshot:
+    st.sidebar.caption(f"Snapshot {snapshot[0]['version']} · generated {snapshot[0]['generated_at']}")
+else:
+    st.sidebar.caption("No snapshot.json; reading the CSV files")
+loaded = {label: load_source(label, sources[label], snapshot) for label in PAGE_SOURCES[menu]}
+
+def page_df(label: str):
+    return loaded[label][0] if label in loaded else None
+
+df_word = page_df("Word Count")
+df_pos  = page_df("Positive Words")
+df_neg  = page_df("Negative Words")
+df_cat  = page_df("Category Count")
+df_avg  = page_df("Avg Rating Category")
+df_prob = page_df("Problem Products")
+df_bigram = page_df("Negative Bigrams")
+
+# Preview runs (SAMPLE_RATE < 1 in mapreduce/sampling.py) are recorded in the
+# snapshot; CSV-only previews are recognised by the avg table's ci columns
+preview = snapshot[0]["sample"] if snapshot else None
+if preview:
+    st.warning(
+        f"**Preview** · hasil dari sampel {preview['rate']:.2%} (seed {preview['seed']}). "
+        f"Count adalah estimasi (dikali {1 / preview['rate']:,.0f}); error bar = "
+        f"interval kepercayaan {preview['confidence']:.0%}."
+    )
+    st.sidebar.warning(f"Preview: sampel {preview['rate']:.2%}")
+elif df_avg is not None and "ci_low" in df_avg.columns:
+    st.warning("**Preview** · hasil dari sampel; count adalah estimasi dan error bar = interval kepercayaan.")
 
 # ---------- Show errors (non-blocking) ----------
-errs = [
-    ("Word Count", err_word),
-    ("Positive", err_pos),
-    ("Negative", err_neg),
-    ("Category Count", err_cat),
-    ("Avg Rating", err_avg),
-    ("Problem Products", err_prob),
-]
 with st.expander("Data Load Status", expanded=False):
-    for name, e in errs:
+    for name, (d, e) in loaded.items():
         if e:
             st.error(f"{name}: {e}")
+        elif d is None:
+            st.info(f"{name}: not generated (optional)")
+        elif d is not None and str(d.attrs.get("fingerprint", "")).startswith("snapshot:"):
+            st.success(f"{name}: loaded from snapshot")
         else:
             st.success(f"{name}: loaded")
 
@@ -321,22 +648,8 @@ if menu == "Overview":
 
     with colB:
         if df_avg is not None and not df_avg.empty and {"category", "avg_rating"}.issubset(df_avg.columns):
-            d = df_avg.sort_values("avg_rating", ascending=False).head(topn)
             st.subheader(f"Top {topn} Categories by Avg Rating")
-            
-            fig = px.bar(d, x="avg_rating", y="category", orientation='h',
-                         labels={"category": "Category", "avg_rating": "Average Rating"},
-                         color="avg_rating", color_continuous_scale="RdYlGn",
-                         text="avg_rating", range_x=[0, 5])
-            
-            fig.update_traces(texttemplate='%{text:.2f}', textposition='outside')
-            fig.update_layout(
-                height=max(400, topn * 20),
-                yaxis={'categoryorder':'total ascending'},
-                showlegend=False,
-                margin=dict(l=20, r=20, t=40, b=20)
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            avg_rating_chart(df_avg, topn)
             st.caption("Rating tinggi = kualitas stabil. Rating rendah = perlu audit QC & seller")
         else:
             st.warning("Avg rating per category not loaded / columns mismatch.")
@@ -366,6 +679,34 @@ elif menu == "Word Insights":
         st.markdown("### Detail Data")
         dataframe_with_download(df_word.head(topn), "top_words.csv")
 
+    st.markdown("---")
+    st.markdown("### Words by Category")
+    matrix = current_word_matrix()
+    if matrix is None:
+        st.info("Jalankan `mapper_category_words.py` → `reducer_category_words.py` → "
+                "`word_matrix.py build outputs/category_words.wcm` untuk kata per kategori.")
+    else:
+        f1, f2 = st.columns(2)
+        category = f1.selectbox("Kategori", ["Semua"] + matrix.categories, key="matrix_category")
+        sentiment = f2.radio("Rating", list(SENTIMENT_RATINGS), horizontal=True, key="matrix_sentiment")
+        df_top, df_dist = category_words(matrix, None if category == "Semua" else category,
+                                         SENTIMENT_RATINGS[sentiment], topn)
+        # figures are cached per matrix version and filter
+        fingerprint = f"matrix:{WORD_MATRIX_PATH.stat().st_mtime_ns}:{category}:{sentiment}"
+        df_top.attrs["fingerprint"] = fingerprint + ":top"
+        left, right = st.columns(2)
+        with left:
+            bar_chart(df_top, "word", "count", f"Top {topn} Words · {category}", topn=topn,
+                      color_scheme="purples", key="matrix_top_chart")
+        with right:
+            if df_dist is None:
+                st.info("Pilih kategori untuk melihat kata pembeda dibanding kategori lain.")
+            else:
+                df_dist.attrs["fingerprint"] = fingerprint + ":distinctive"
+                bar_chart(df_dist, "word", "log_odds_z", f"Most Distinctive Words · {category}", topn=topn,
+                          color_scheme="purples", key="matrix_distinctive_chart", value_format=".1f")
+                st.caption("Skor z log-odds vs kategori lain (prior Dirichlet dari seluruh korpus); z > 1.96 ≈ signifikan")
+
 elif menu == "Sentiment":
     st.subheader("Positive vs Negative Words")
     st.caption("Driver kepuasan vs akar keluhan untuk aksi perbaikan yang tepat")
@@ -386,10 +727,46 @@ elif menu == "Sentiment":
         if df_neg is None or df_neg.empty:
             st.warning("Negative words data not loaded.")
         else:
-            bar_chart(df_neg, "word", "count", f"Top {topn} Negative Words", topn=topn, color_scheme="reds")
-            st.caption("Root cause keluhan → perkuat QC & validasi seller")
+            clicked_word = bar_chart(df_neg, "word", "count", f"Top {topn} Negative Words", topn=topn,
+                                     color_scheme="reds", key="neg_words_chart", selectable=True)
+            st.caption("Root cause keluhan → perkuat QC & validasi seller · klik kata untuk melihat produknya")
             dataframe_with_download(df_neg.head(topn), "negative_words_top.csv")
 
+    st.markdown("---")
+    st.markdown("### Produk di Balik Kata Negatif")
+    if not WORD_INDEX_PATH.exists():
+        st.info("Jalankan `mapper_word_products.py` → `reducer_word_products.py` → "
+                "`word_index.py build outputs/word_products.idx` untuk drill-down kata → produk.")
+    elif df_neg is not None and not df_neg.empty:
+        words = df_neg["word"].astype(str).head(topn).tolist()
+        # a click on the chart picks the word once; the selectbox can still
+        # change it while the click stays selected
+        if clicked_word in words and clicked_word != st.session_state.get("drill_clicked"):
+            st.session_state.drill_word = clicked_word
+        st.session_state.drill_clicked = clicked_word
+        word = st.selectbox("Kata negatif", words, key="drill_word")
+        t0 = time.perf_counter()
+        result = word_products(word)
+        lookup_ms = (time.perf_counter() - t0) * 1000
+        total, items = result or (0, [])
+        if result is None:
+            st.error(f"{WORD_INDEX_PATH} tidak dapat dibaca; bangun ulang dengan `word_index.py build`.")
+        elif not items:
+            st.info(f"Tidak ada ulasan rating ≤ 2 dengan kata \"{word}\" di index.")
+        else:
+            d = pd.DataFrame(items, columns=["product_name", "negative_review_count"])
+            bar_chart(d, "product_name", "negative_review_count", f"Top Products for \"{word}\"",
+                      topn=len(d), color_scheme="reds")
+            st.caption(f"\"{word}\" muncul di {total:,} ulasan rating ≤ 2 · lookup {lookup_ms:.1f} ms")
+
+    st.markdown("---")
+    st.markdown("### Negative Phrases (bigram, rating ≤ 2)")
+    if df_bigram is None or df_bigram.empty:
+        st.info("Jalankan `mapper_ngrams.py` → `reducer_decode_topn_csv.py` untuk membuat `negative_bigrams.csv`.")
+    else:
+        bar_chart(df_bigram, "phrase", "count", f"Top {topn} Negative Phrases", topn=topn, color_scheme="reds")
+        st.caption("Frasa memperjelas keluhan: \"tidak sesuai\", \"barang rusak\" → tindakan QC yang spesifik")
+        dataframe_with_download(df_bigram.head(topn), "negative_bigrams_top.csv")
 
 
 elif menu == "Category Performance":
@@ -412,21 +789,7 @@ elif menu == "Category Performance":
         if df_avg is None or df_avg.empty or not {"category", "avg_rating", "review_count"}.issubset(df_avg.columns):
             st.warning("Avg rating per category not loaded / columns mismatch.")
         else:
-            d = df_avg.sort_values("avg_rating", ascending=False).head(topn)
-            
-            fig = px.bar(d, x="avg_rating", y="category", orientation='h',
-                         labels={"category": "Category", "avg_rating": "Average Rating"},
-                         color="avg_rating", color_continuous_scale="RdYlGn",
-                         text="avg_rating", range_x=[0, 5])
-            
-            fig.update_traces(texttemplate='%{text:.2f}', textposition='outside')
-            fig.update_layout(
-                height=max(400, topn * 20),
-                yaxis={'categoryorder':'total ascending'},
-                showlegend=False,
-                margin=dict(l=20, r=20, t=40, b=20)
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            d = avg_rating_chart(df_avg, topn)
             st.caption("Rating rendah perlu audit QC & seller")
             dataframe_with_download(d, "category_avg_rating_top.csv")
 
@@ -448,21 +811,11 @@ elif menu == "Category Performance":
         if "avg_rating" in m.columns:
             m["avg_rating"] = pd.to_numeric(m["avg_rating"], errors="coerce")
 
-        # Create scatter plot for opportunity matrix
-        fig = px.scatter(m, x="review_count", y="avg_rating", 
-                        hover_data=["category"],
-                        size="review_count",
-                        color="avg_rating",
-                        color_continuous_scale="RdYlGn",
-                        labels={"review_count": "Review Volume", "avg_rating": "Avg Rating"},
-                        range_y=[0, 5])
-        
-        fig.update_layout(height=500, showlegend=False)
-        fig.add_hline(y=3.5, line_dash="dash", line_color="gray", annotation_text="Quality Threshold")
-        fig.add_vline(x=m["review_count"].median(), line_dash="dash", line_color="gray", annotation_text="Volume Median")
-        
+        fp_cat, fp_avg = df_cat.attrs.get("fingerprint"), df_avg.attrs.get("fingerprint")
+        m.attrs["fingerprint"] = f"{fp_cat}|{fp_avg}" if fp_cat and fp_avg else None
+        fig = figure(m, "opportunity", 0, m)
         st.plotly_chart(fig, use_container_width=True)
-        
+
         col1, col2, col3, col4 = st.columns(4)
         with col1:
             st.success("**High Vol + High Rating**\n\nPromosi")
@@ -498,6 +851,40 @@ elif menu == "Problem Products":
         st.markdown("### Detail Data")
         dataframe_with_download(df_prob.head(topn), "problem_products_top.csv")
 
+elif menu == "Explore Full Data":
+    st.subheader("Explore Full Data")
+    st.caption("Semua key hasil pipeline (bukan hanya Top-N), langsung dari SQLite ter-index")
+
+    if not STORE_PATH.exists():
+        st.warning(
+            f"{STORE_PATH} belum ada. Jalankan reducer dengan `SQLITE_DB={STORE_PATH}` "
+            "dan `SQLITE_TABLE=<nama tabel>` untuk mengisinya."
+        )
+    else:
+        available = store_tables(STORE_PATH)
+        choices = [label for label, (table, _, _) in STORE_TABLES.items() if table in available]
+        if not choices:
+            st.warning("Tidak ada tabel yang dikenal di database.")
+        else:
+            c1, c2, c3 = st.columns([2, 3, 1])
+            label = c1.selectbox("Dataset", choices)
+            prefix = c2.text_input("Cari kata / produk (awalan)", key="store_prefix").strip()
+            page_size = c3.selectbox("Rows", [50, 100, 500], index=1)
+            table, key_col, count_col = STORE_TABLES[label]
+            if label in ("Word Count", "Positive Words", "Negative Words"):
+                prefix = prefix.lower()
+
+            mtime_ns = STORE_PATH.stat().st_mtime_ns
+            total, _ = query_store(str(STORE_PATH), mtime_ns, table, prefix, 0, 0)
+            pages = max(1, -(-total // page_size))
+            page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1)
+            offset = (int(page) - 1) * page_size
+            _, rows = query_store(str(STORE_PATH), mtime_ns, table, prefix, page_size, offset)
+
+            st.caption(f"Baris {min(offset + 1, total):,}–{offset + len(rows):,} dari {total:,} (halaman {int(page)}/{pages})")
+            df_page = pd.DataFrame(rows, columns=[key_col, count_col])
+            dataframe_with_download(df_page, f"{table}_page{int(page)}.csv")
+
 else:
     st.subheader("Settings / Data Loader")
     st.info("Atur file path atau upload CSV melalui panel **Data Sources** di atas. Pastikan format CSV dengan header.")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Seeded synthetic Tokopedia-review generator.
+
+    python bench/generate_reviews.py --rows 1000000 --seed 42 -o bench/data/reviews_1m.csv
+
+Same schema as the real dump (text, rating, category, product_name) with the
+skew the jobs care about: "elektronik" about twice the next category, a
+Zipfian vocabulary, ratings heavy on 5, complaint words concentrated in low
+ratings, long product names, and a few multi-line / quoted / emoji texts.
+"""
+import argparse
+import csv
+import random
+import sys
+
+CATEGORIES = [
+    ("elektronik", 16.0), ("fashion", 9.0), ("olahraga", 7.9), ("handphone", 7.0),
+    ("kecantikan", 6.2), ("rumah tangga", 5.5), ("makanan minuman", 4.1),
+    ("otomotif", 3.0), ("kesehatan", 2.6), ("buku", 1.5), ("mainan hobi", 1.2),
+]
+RATINGS = [1, 2, 3, 4, 5]
+RATING_WEIGHTS = [2.0, 1.2, 2.5, 9.0, 85.3]
+
+COMMON = (
+    "barang sesuai cepat pengiriman bagus mantap seller packing rapi original "
+    "terima kasih kualitas harga murah recommended puas sampai aman baik banget "
+    "respon ramah produk berfungsi dengan sangat oke lagi order pesanan kurir "
+    "jos sip lumayan worth it awet bahan nyaman ukuran warna mulus"
+).split()
+NEGATIVE = (
+    "tidak rusak kecewa lama pecah cacat salah kurang jelek mati retur palsu "
+    "lambat hilang penyok lecet bau beda tipis sobek error"
+).split()
+BRANDS = "Samsung Xiaomi NOKIA Oppo Vivo Realme Asus Lenovo Philips Miyako Cosmos Adidas Nike Wardah Emina".split()
+NOUNS = (
+    "Headset Bluetooth, Earphone, Charger Fast Charging, Kabel Data Type C, Powerbank 10000mAh, "
+    "Handphone, Kaos Polos, Sepatu Lari, Blender, Rice Cooker, Setrika, Lipstik Matte, Serum Wajah, "
+    "Matras Yoga, Dumbbell, Helm, Kopi Bubuk, Buku Novel"
+).split(", ")
+SUFFIXES = (
+    "murah, original, garansi resmi, baru, dual sim, stereo, mini, sport, "
+    "bergaransi 1 tahun, COD, promo, grosir, premium, best seller"
+).split(", ")
+
+
+def zipf_weights(n, s=1.2):
+    return [1.0 / (i + 1) ** s for i in range(n)]
+
+
+def build_vocab(rng, size):
+    # real words first (most frequent), then synthetic long tail
+    vocab = list(dict.fromkeys(COMMON + NEGATIVE))
+    letters = "abcdefghijklmnoprstuwy"
+    while len(vocab) < size:
+        vocab.append("".join(rng.choice(letters) for _ in range(rng.randint(3, 10))))
+    return vocab
+
+
+def build_products(rng, n):
+    products = []
+    for _ in range(n):
+        parts = [rng.choice(BRANDS), rng.choice(NOUNS)]
+        if rng.random() < 0.6:
+            parts.append(f"{rng.choice('ABCDEFGHJKLMNPRSTX')}{rng.choice('ABCDEFGHJKLMNPRSTX')}-{rng.randint(100, 9999)}")
+        parts += rng.sample(SUFFIXES, rng.randint(1, 4))
+        products.append(" ".join(parts))
+    return products
+
+
+def generate(rows, seed, out, vocab_size=50_000, n_products=20_000, batch=10_000):
+    rng = random.Random(seed)
+    vocab = build_vocab(rng, vocab_size)
+    vocab_cum = []
+    acc = 0.0
+    for w in zipf_weights(len(vocab)):
+        acc += w
+        vocab_cum.append(acc)
+    products = build_products(rng, n_products)
+    prod_cum = []
+    acc = 0.0
+    for w in zipf_weights(len(products), s=0.9):
+        acc += w
+        prod_cum.append(acc)
+    cats = [c for c, _ in CATEGORIES]
+    cat_weights = [w for _, w in CATEGORIES]
+
+    writer = csv.writer(out)
+    writer.writerow(["text", "rating", "category", "product_name"])
+    done = 0
+    while done < rows:
+        n = min(batch, rows - done)
+        ratings = rng.choices(RATINGS, RATING_WEIGHTS, k=n)
+        categories = rng.choices(cats, cat_weights, k=n)
+        prods = rng.choices(products, cum_weights=prod_cum, k=n)
+        lengths = [rng.randint(1, 25) for _ in range(n)]
+        words = rng.choices(vocab, cum_weights=vocab_cum, k=sum(lengths))
+        pos = 0
+        out_rows = []
+        for i in range(n):
+            toks = words[pos:pos + lengths[i]]
+            pos += lengths[i]
+            if ratings[i] <= 2:
+                toks += rng.sample(NEGATIVE, rng.randint(1, 3))
+                rng.shuffle(toks)
+            text = " ".join(toks)
+            r = rng.random()
+            if r < 0.05:
+                text = text.capitalize() + "!!"
+            elif r < 0.07:
+                text += "\nupdate: " + " ".join(rng.choices(COMMON, k=3))
+            elif r < 0.08:
+                text += ' "mantap" \U0001f44d'
+            out_rows.append((text, ratings[i], categories[i], prods[i]))
+        writer.writerows(out_rows)
+        done += n
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--vocab", type=int, default=50_000, help="vocabulary size")
+    ap.add_argument("--products", type=int, default=20_000, help="distinct product names")
+    ap.add_argument("-o", "--output", help="CSV path (default: stdout)")
+    args = ap.parse_args()
+
+    if args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            generate(args.rows, args.seed, f, args.vocab, args.products)
+    else:
+        generate(args.rows, args.seed, sys.stdout, args.vocab, args.products)
+
+
+if __name__ == "__main__":
+    main()
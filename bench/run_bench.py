@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""Benchmark suite for the mapreduce/ pipelines and the dashboard load path.
+
+    python bench/run_bench.py --rows 100000 [--rows 1000000 ...] [--env COMBINE=1]
+
+For every size, generates (or reuses) bench/data/reviews_<rows>.csv with
+generate_reviews.py, then times each `mapper | LC_ALL=C sort | reducer`
+pipeline and the dashboard's loaders (dashboard_data.py) over the outputs,
+as CSV and as the snapshot.json published from them. Each entry records wall
+time, rows/s, peak RSS per stage and a SHA-256 of the output, and the whole run
+is written as JSON to bench/results/ (or --out) for regression tracking.
+--map-only times the mappers alone and reports records/s.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+MR = os.path.join(ROOT, "mapreduce")
+
+# name -> (mapper, reducer, extra env)
+PIPELINES = {
+    "wordcount": ("mapper_wordcount.py", "reducer_topn_counter_csv.py", {"HEADER": "word,count"}),
+    "positive_words": ("mapper_positive_words.py", "reducer_topn_counter_csv.py", {"HEADER": "word,count"}),
+    "negative_words": ("mapper_negative_words.py", "reducer_topn_counter_csv.py", {"HEADER": "word,count"}),
+    "category_count": ("mapper_category_count.py", "reducer_topn_counter_csv.py", {"HEADER": "category,review_count"}),
+    "avg_rating_category": ("mapper_avg_rating_category.py", "reducer_avg_rating_category_csv.py", {}),
+    "problem_products": ("mapper_problem_products.py", "reducer_topn_counter_csv.py",
+                         {"HEADER": "product_name,negative_review_count"}),
+    "problem_products_encoded": ("mapper_problem_products.py", "reducer_decode_topn_csv.py",
+                                 {"HEADER": "product_name,negative_review_count", "ENCODE_KEYS": "1"}),
+    "negative_bigrams": ("mapper_ngrams.py", "reducer_decode_topn_csv.py", {"HEADER": "phrase,count"}),
+}
+
+# the dashboard's own readers (dashboard_data.py, which app.py caches), over
+# the snapshot.json published from the outputs and over the same tables as CSV
+DASHBOARD_LOAD = """
+import sys, time
+from pathlib import Path
+sys.path.insert(0, sys.argv[1])
+from dashboard_data import find_output, read_csv, read_snapshot
+out_dir = Path(sys.argv[2])
+# untimed first pass: the table names, and pandas warmed up as in a running app
+_, tables = read_snapshot(out_dir / "snapshot.json")
+paths = [find_output(out_dir / f"{name}.csv") for name in tables]
+t0 = time.perf_counter()
+csv_rows = sum(len(read_csv(p)) for p in paths)
+t1 = time.perf_counter()
+_, tables = read_snapshot(out_dir / "snapshot.json")
+snapshot_rows = sum(len(t) for t in tables.values())
+print(csv_rows, t1 - t0, snapshot_rows, time.perf_counter() - t1)
+"""
+
+
+def wait_rss(procs):
+    # os.wait4 gives each child's own rusage; ru_maxrss is KiB on Linux and
+    # starts from the forking process's RSS, so small stages read as its size
+    rss = []
+    for p in procs:
+        _, status, usage = os.wait4(p.pid, 0)
+        p.returncode = os.waitstatus_to_exitcode(status)
+        rss.append(usage.ru_maxrss * 1024 if sys.platform != "darwin" else usage.ru_maxrss)
+    return rss
+
+
+def run_pipeline(data, mapper, reducer, env, out_path):
+    sort_env = dict(env, LC_ALL="C")
+    t0 = time.perf_counter()
+    with open(data, "rb") as src, open(out_path, "wb") as out:
+        m = subprocess.Popen([sys.executable, os.path.join(MR, mapper)], stdin=src,
+                             stdout=subprocess.PIPE, env=env)
+        s = subprocess.Popen(["sort"], stdin=m.stdout, stdout=subprocess.PIPE, env=sort_env)
+        m.stdout.close()
+        r = subprocess.Popen([sys.executable, os.path.join(MR, reducer)], stdin=s.stdout,
+                             stdout=out, env=env)
+        s.stdout.close()
+        rss = wait_rss([m, s, r])
+    wall = time.perf_counter() - t0
+    codes = [m.returncode, s.returncode, r.returncode]
+    if any(codes):
+        raise RuntimeError(f"{mapper} | sort | {reducer} exited with {codes}")
+    return wall, dict(zip(["mapper", "sort", "reducer"], rss))
+
+
+def run_mapper(data, mapper, env):
+    # mapper alone, output counted and discarded: records/s of the map stage
+    t0 = time.perf_counter()
+    records = nbytes = 0
+    with open(data, "rb") as src:
+        m = subprocess.Popen([sys.executable, os.path.join(MR, mapper)], stdin=src,
+                             stdout=subprocess.PIPE, env=env)
+        for block in iter(lambda: m.stdout.read(1 << 20), b""):
+            records += block.count(b"\n")
+            nbytes += len(block)
+        m.stdout.close()
+        rss = wait_rss([m])[0]
+    wall = time.perf_counter() - t0
+    if m.returncode:
+        raise RuntimeError(f"{mapper} exited with {m.returncode}")
+    return wall, rss, records, nbytes
+
+
+def sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def count_rows(path):
+    import csv
+    with open(path, newline="", encoding="utf-8") as f:
+        return sum(1 for _ in csv.reader(f)) - 1
+
+
+def ensure_dataset(rows, seed, data_dir):
+    path = os.path.join(data_dir, f"reviews_{rows}_s{seed}.csv")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(HERE, "generate_reviews.py"),
+                        "--rows", str(rows), "--seed", str(seed), "-o", path + ".tmp"], check=True)
+        os.replace(path + ".tmp", path)
+        print(f"generated {path} in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+    return path
+
+
+def bench_size(rows, args, env):
+    data = ensure_dataset(rows, args.seed, args.data_dir)
+    records = []
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        outputs = []
+        for name, (mapper, reducer, extra) in PIPELINES.items():
+            if args.only and name not in args.only:
+                continue
+            if args.map_only:
+                wall, rss, n, nbytes = run_mapper(data, mapper, dict(env, **extra))
+                records.append({
+                    "kind": "map", "name": name, "rows": rows, "wall_s": round(wall, 4),
+                    "rows_per_s": round(rows / wall, 1), "records": n,
+                    "records_per_s": round(n / wall, 1), "bytes": nbytes, "peak_rss_bytes": rss,
+                })
+                print(f"{rows:>10,} {name:22s} {wall:8.2f}s {n / wall:12,.0f} records/s "
+                      f"{n:>12,} records", file=sys.stderr)
+                continue
+            out = os.path.join(tmp, f"{name}.csv")
+            wall, rss = run_pipeline(data, mapper, reducer, dict(env, **extra), out)
+            outputs.append(out)
+            records.append({
+                "kind": "pipeline", "name": name, "rows": rows, "wall_s": round(wall, 4),
+                "rows_per_s": round(rows / wall, 1), "peak_rss_bytes": rss,
+                "output_sha256": sha256(out),
+            })
+            print(f"{rows:>10,} {name:22s} {wall:8.2f}s {rows / wall:12,.0f} rows/s "
+                  f"rss max {max(rss.values()) / 2**20:7.1f} MiB", file=sys.stderr)
+
+        if outputs and not args.skip_dashboard:
+            subprocess.run([sys.executable, os.path.join(MR, "snapshot.py"), tmp],
+                           env=env, check=True, stderr=subprocess.DEVNULL)
+            # stderr to a file, not a pipe: wait_rss() waits before it could be read
+            with tempfile.TemporaryFile() as err:
+                t0 = time.perf_counter()
+                p = subprocess.Popen([sys.executable, "-c", DASHBOARD_LOAD, ROOT, tmp],
+                                     stdout=subprocess.PIPE, stderr=err, env=env)
+                out = p.stdout.read().decode().split()
+                p.stdout.close()
+                rss = wait_rss([p])[0]
+                process_s = round(time.perf_counter() - t0, 4)
+                if p.returncode:
+                    err.seek(0)
+                    raise RuntimeError(f"dashboard load exited with {p.returncode} "
+                                       f"(--skip-dashboard to leave it out):\n"
+                                       f"{err.read().decode(errors='replace')}")
+            for name, loaded, load_s in (("read_csv", out[0], out[1]),
+                                         ("read_snapshot", out[2], out[3])):
+                loaded, load_s = int(loaded), float(load_s)
+                records.append({
+                    "kind": "dashboard_load", "name": name, "rows": rows,
+                    "loaded_rows": loaded, "wall_s": round(load_s, 4),
+                    "process_s": process_s,
+                    "rows_per_s": round(loaded / load_s, 1) if load_s else None,
+                    "peak_rss_bytes": rss,
+                })
+                print(f"{rows:>10,} {'dashboard ' + name:22s} {load_s:8.3f}s", file=sys.stderr)
+    return records
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--rows", type=int, action="append",
+                    help="dataset size, repeatable (default 100000)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                    help="extra environment for every stage, e.g. COMBINE=1")
+    ap.add_argument("--only", action="append", choices=list(PIPELINES), help="run only these pipelines")
+    ap.add_argument("--map-only", action="store_true",
+                    help="time the mappers alone and report records/s")
+    ap.add_argument("--skip-dashboard", action="store_true")
+    ap.add_argument("--data-dir", default=os.path.join(HERE, "data"))
+    ap.add_argument("--out", help="results JSON (default bench/results/<timestamp>.json)")
+    args = ap.parse_args()
+
+    env = dict(os.environ)
+    extra_env = dict(kv.split("=", 1) for kv in args.env)
+    env.update(extra_env)
+
+    results = {
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "env": extra_env,
+        "records": [],
+    }
+    for rows in args.rows or [100_000]:
+        results["records"] += bench_size(rows, args, env)
+
+    out = args.out or os.path.join(HERE, "results", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
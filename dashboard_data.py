@@ -0,0 +1,52 @@
+"""Readers behind the dashboard's data loads, without Streamlit.
+
+app.py wraps these in st.cache_data; bench/run_bench.py times them directly,
+so the benchmark measures the same code the dashboard runs.
+"""
+import io
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# the pipeline's readers live next to the scripts in mapreduce/
+sys.path.insert(0, str(Path(__file__).resolve().parent / "mapreduce"))
+from stream_io import SUFFIXES, sniff
+
+# Outputs may be written compressed (OUTPUT_COMPRESSION in mapreduce/); the
+# format is taken from the magic bytes, so the file name does not matter
+COMPRESSED_SUFFIXES = tuple(SUFFIXES.values())
+
+
+def find_output(p: Path):
+    # newest of x.csv, x.csv.gz, ... so a run that switched compression on
+    # or off is not shadowed by a stale file
+    candidates = [c for c in [p, *(p.with_name(p.name + s) for s in COMPRESSED_SUFFIXES)] if c.exists()]
+    return max(candidates, key=lambda c: c.stat().st_mtime_ns, default=None)
+
+
+def read_csv(path) -> pd.DataFrame:
+    with open(path, "rb") as f:
+        return pd.read_csv(f, compression=sniff(f))
+
+
+def read_uploaded_csv(data: bytes) -> pd.DataFrame:
+    f = io.BufferedReader(io.BytesIO(data))
+    return pd.read_csv(f, compression=sniff(f))
+
+
+def read_snapshot(path):
+    """(info, {table: DataFrame}) from a snapshot.json."""
+    # one read for every table; JSON keeps the ints, floats and strings the
+    # pipeline wrote, so no per-column parsing
+    with open(path, encoding="utf-8") as f:
+        doc = json.load(f)
+    tables = {
+        name: pd.DataFrame(doc["tables"][name], columns=meta["columns"])
+        for name, meta in doc["manifest"].items()
+    }
+    info = {k: doc[k] for k in ("version", "generated_at")}
+    info["sample"] = doc.get("sample")
+    info["rows"] = {name: meta["rows"] for name, meta in doc["manifest"].items()}
+    return info, tables
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Tokenizer throughput benchmark.
+
+    python mapreduce/bench_tokenizer.py reviews.csv [repeat]
+
+Compares the inline tokenizing the text mappers used to do with
+tokenizer.tokenize / tokenize_batch, in tokens/sec, and fails if the token
+streams are not byte-identical.
+"""
+import sys
+import csv
+import re
+import time
+
+from tokenizer import BATCH_ROWS, tokenize, tokenize_batch
+
+EDGE_CASES = [
+    "", "   ", "OK", "Barang SESUAI, pengiriman cepat!!!", "tab\tsep\x0bvt\x1cfs",
+    "harga 100rb mantap", "KELVIN K sign", "İstanbul kargo", "café résumé naïve",
+    "emoji \U0001f44d bagus", "nbsp\xa0pisah", "line\u2028sep\x85nel", "ΑΣ greek",
+]
+
+
+def legacy(text):
+    text = re.sub(r'[^a-z\s]', ' ', text.lower())
+    return [w for w in text.split() if len(w) > 2]
+
+
+def run_rows(fn, texts):
+    out = []
+    for t in texts:
+        out.extend(fn(t))
+    return out
+
+
+def run_batched(texts):
+    out = []
+    for i in range(0, len(texts), BATCH_ROWS):
+        out.extend(tokenize_batch(texts[i:i + BATCH_ROWS]))
+    return out
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    with open(sys.argv[1], newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        text_idx = next(reader).index("text")
+        texts = [row[text_idx] for row in reader if len(row) > text_idx]
+    texts += EDGE_CASES
+
+    expected = "\n".join(run_rows(legacy, texts)).encode("utf-8")
+    candidates = [
+        ("legacy re.sub per row", lambda: run_rows(legacy, texts)),
+        ("tokenize per row", lambda: run_rows(tokenize, texts)),
+        (f"tokenize_batch x{BATCH_ROWS}", lambda: run_batched(texts)),
+    ]
+    base = None
+    for name, fn in candidates:
+        best = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            tokens = fn()
+            dt = time.perf_counter() - t0
+            best = dt if best is None else min(best, dt)
+        identical = "\n".join(tokens).encode("utf-8") == expected
+        rate = len(tokens) / best if best else float("inf")
+        base = base or rate
+        print(f"{name:28s} {rate:14,.0f} tokens/s  x{rate / base:5.2f}  "
+              f"{'identical' if identical else 'MISMATCH'}")
+        if not identical:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
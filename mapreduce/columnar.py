@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""Columnar cache of the review dataset for the jobs that skip `text`.
+
+    python mapreduce/columnar.py build reviews.csv            # -> reviews.csv.cols/
+    TOPN=50 python mapreduce/columnar.py category_count reviews.csv.cols
+    python mapreduce/columnar.py avg_rating_category reviews.csv.cols
+    TOPN=50 python mapreduce/columnar.py problem_products reviews.csv.cols
+
+The cache holds `rating` as int8 and `category` / `product_name` as int32 codes
+into sorted dictionaries, all as .npy files loaded with mmap_mode="r". The
+aggregations print the same CSV as the matching mapper + reducer pipeline
+over sorted shuffle input (TOPN and HEADER as in reducer_topn_counter_csv.py).
+They refuse a cache whose source CSV has changed size or mtime since the build.
+"""
+import sys
+import csv
+import os
+import json
+import time
+from array import array
+
+import numpy as np
+
+from task_stats import start_task
+
+TOPN = int(os.environ.get("TOPN", "50"))
+
+MISSING_RATING = -128  # not an int, or outside the int8 range
+MISSING_CODE = -1  # row too short to have the column
+
+
+def encode(values, codes):
+    # re-number first-seen codes so code order matches string order; ties in
+    # the top-N then come out in key order, like the sorted shuffle
+    ordered = sorted(values)
+    rank = {v: i for i, v in enumerate(ordered)}
+    remap = np.array([rank[v] for v in values], dtype=np.int32)
+    codes = np.frombuffer(codes, dtype=np.int32).copy()
+    valid = codes >= 0
+    codes[valid] = remap[codes[valid]]
+    return ordered, codes
+
+
+def save_dictionary(cache_dir, name, ordered):
+    blobs = [v.encode("utf-8") for v in ordered]
+    offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in blobs], out=offsets[1:])
+    with open(os.path.join(cache_dir, f"{name}.dict.bin"), "wb") as f:
+        f.write(b"".join(blobs))
+    np.save(os.path.join(cache_dir, f"{name}.offsets.npy"), offsets)
+
+
+def build(csv_path, cache_dir=None):
+    cache_dir = cache_dir or csv_path + ".cols"
+    os.makedirs(cache_dir, exist_ok=True)
+    t0 = time.perf_counter()
+
+    ratings = array("b")
+    cat_codes, prod_codes = array("i"), array("i")
+    cats, prods = {}, {}
+
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        rating_idx = header.index("rating")
+        cat_idx = header.index("category")
+        prod_idx = header.index("product_name")
+
+        for row in reader:
+            try:
+                r = int(row[rating_idx])
+                if not -127 <= r <= 127:
+                    r = MISSING_RATING
+            except (IndexError, ValueError):
+                r = MISSING_RATING
+            ratings.append(r)
+            if len(row) > cat_idx:
+                cat_codes.append(cats.setdefault(row[cat_idx].strip(), len(cats)))
+            else:
+                cat_codes.append(MISSING_CODE)
+            if len(row) > prod_idx:
+                prod_codes.append(prods.setdefault(row[prod_idx].strip(), len(prods)))
+            else:
+                prod_codes.append(MISSING_CODE)
+
+    for name, values, codes in (("category", cats, cat_codes), ("product_name", prods, prod_codes)):
+        ordered, codes = encode(values, codes)
+        np.save(os.path.join(cache_dir, f"{name}.codes.npy"), codes)
+        save_dictionary(cache_dir, name, ordered)
+    np.save(os.path.join(cache_dir, "rating.npy"), np.frombuffer(ratings, dtype=np.int8))
+
+    st = os.stat(csv_path)
+    manifest = {
+        "source": os.path.abspath(csv_path),
+        "source_size": st.st_size,
+        "source_mtime": st.st_mtime,
+        "rows": len(ratings),
+        "categories": len(cats),
+        "products": len(prods),
+    }
+    with open(os.path.join(cache_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    sys.stderr.write(f"built {cache_dir}: {len(ratings):,} rows in {time.perf_counter() - t0:.2f}s\n")
+
+
+class StaleCache(Exception):
+    pass
+
+
+class ColumnCache:
+    def __init__(self, cache_dir):
+        self.dir = cache_dir
+        with open(os.path.join(cache_dir, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        self.check_source()
+
+    def check_source(self):
+        # the daily append changes the source after the build; a moved or
+        # deleted source cannot be checked and is let through
+        source = self.manifest["source"]
+        try:
+            st = os.stat(source)
+        except FileNotFoundError:
+            sys.stderr.write(f"columnar: {source} not found, cannot check {self.dir} is current\n")
+            return
+        if st.st_size != self.manifest["source_size"] or st.st_mtime != self.manifest["source_mtime"]:
+            raise StaleCache(f"{self.dir} is older than {source}; rebuild it with `columnar.py build`")
+
+    def column(self, name):
+        return np.load(os.path.join(self.dir, f"{name}.npy"), mmap_mode="r")
+
+    def lookup(self, name, codes):
+        offsets = self.column(f"{name}.offsets")
+        with open(os.path.join(self.dir, f"{name}.dict.bin"), "rb") as f:
+            blob = np.memmap(f, dtype=np.uint8, mode="r") if offsets[-1] else b""
+            return [bytes(blob[offsets[c]:offsets[c + 1]]).decode("utf-8") for c in codes]
+
+    def empty_code(self, name):
+        # "" sorts first, so it can only ever be code 0
+        offsets = self.column(f"{name}.offsets")
+        return 0 if len(offsets) > 1 and offsets[1] == 0 else None
+
+
+def top_counts(cache, name, counts):
+    empty = cache.empty_code(name)
+    if empty is not None:
+        counts[empty] = 0
+    codes = np.flatnonzero(counts)
+    order = np.lexsort((codes, -counts[codes]))[:max(TOPN, 0)]
+    codes = codes[order]
+
+    writer = csv.writer(sys.stdout)
+    header = os.environ.get("HEADER", "")
+    if header:
+        writer.writerow([h.strip() for h in header.split(",")])
+    for k, c in zip(cache.lookup(name, codes), counts[codes]):
+        writer.writerow([k, int(c)])
+
+
+def category_count(cache):
+    codes = cache.column("category.codes")
+    n = len(cache.column("category.offsets")) - 1
+    counts = np.bincount(codes[codes >= 0], minlength=n)
+    top_counts(cache, "category", counts)
+
+
+def problem_products(cache):
+    ratings = cache.column("rating")
+    codes = cache.column("product_name.codes")
+    n = len(cache.column("product_name.offsets")) - 1
+    mask = (ratings != MISSING_RATING) & (ratings <= 2) & (codes >= 0)
+    counts = np.bincount(codes[mask], minlength=n)
+    top_counts(cache, "product_name", counts)
+
+
+def avg_rating_category(cache):
+    ratings = cache.column("rating")
+    codes = cache.column("category.codes")
+    n = len(cache.column("category.offsets")) - 1
+    mask = (ratings != MISSING_RATING) & (codes >= 0)
+    sums = np.bincount(codes[mask], weights=ratings[mask], minlength=n)
+    counts = np.bincount(codes[mask], minlength=n)
+
+    cats = np.flatnonzero(counts)
+    avgs = sums[cats] / counts[cats]
+    order = np.lexsort((cats, -avgs))
+
+    writer = csv.writer(sys.stdout)
+    writer.writerow(["category", "avg_rating", "review_count"])
+    names = cache.lookup("category", cats[order])
+    for cat, avg, c in zip(names, avgs[order], counts[cats][order]):
+        writer.writerow([cat, f"{avg:.2f}", int(c)])
+
+
+JOBS = {
+    "category_count": category_count,
+    "avg_rating_category": avg_rating_category,
+    "problem_products": problem_products,
+}
+
+if __name__ == "__main__":
+    start_task("columnar")
+    if len(sys.argv) >= 3 and sys.argv[1] == "build":
+        build(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+    elif len(sys.argv) == 3 and sys.argv[1] in JOBS:
+        try:
+            cache = ColumnCache(sys.argv[2])
+        except StaleCache as e:
+            sys.exit(f"columnar: {e}")
+        JOBS[sys.argv[1]](cache)
+    else:
+        sys.exit(__doc__)
@@ -0,0 +1,94 @@
+import hashlib
+import math
+import os
+import sys
+
+# Duplicate reviews from re-crawls. A review is identified by its normalized
+# (case-folded, whitespace-collapsed) product_name, text and rating.
+#
+# DEDUP=1 drops repeats inside each mapper task with a Bloom filter sized for
+# DEDUP_CAPACITY distinct reviews at DEDUP_FP_RATE (defaults 1,000,000 and
+# 0.001: about 1.8 MB). Memory stays fixed; a false positive drops a review
+# that was not a duplicate, and the expected rate for the reviews actually
+# seen is reported at exit together with the number of drops (counters
+# duplicates_dropped, dedup_fp_ppm). Duplicates in different input splits are
+# not caught: for exact, global dedup run mapper_dedup.py / reducer_dedup.py
+# as a pre-job and feed its output to the analyses.
+DEDUP = os.environ.get("DEDUP", "0") == "1"
+DEDUP_CAPACITY = int(os.environ.get("DEDUP_CAPACITY", "1000000"))
+DEDUP_FP_RATE = float(os.environ.get("DEDUP_FP_RATE", "0.001"))
+FIELDS = ("product_name", "text", "rating")
+
+
+def normalize(text):
+    return " ".join(text.casefold().split())
+
+
+def fingerprint(row, idx):
+    # IndexError for rows shorter than the header
+    key = "\x1f".join(normalize(row[i]) for i in idx)
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+
+class BloomFilter:
+    def __init__(self, capacity, fp_rate):
+        self.m = max(64, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.k = max(1, round(self.m / capacity * math.log(2)))
+        self.bits = bytearray((self.m + 7) // 8)
+        self.n = 0  # items added
+
+    def add(self, digest):
+        """Add a 16-byte digest; True when it was (probably) already present."""
+        # double hashing: k positions h1, h1 + h2, ... from the two halves of
+        # the digest
+        h = int.from_bytes(digest, "little")
+        h1, h2 = h & 0xFFFFFFFFFFFFFFFF, (h >> 64) | 1
+        bits, m = self.bits, self.m
+        new = False
+        for _ in range(self.k):
+            pos = h1 % m
+            h1 += h2
+            old = bits[pos >> 3]
+            val = old | (1 << (pos & 7))
+            if val != old:
+                bits[pos >> 3] = val
+                new = True
+        if new:
+            self.n += 1
+        return not new
+
+    def fp_rate(self):
+        return (1 - math.exp(-self.k * self.n / self.m)) ** self.k
+
+
+def dedup_rows(rows, header, stats):
+    # pass-through unless DEDUP=1
+    if not DEDUP:
+        return rows
+    return _dedup(rows, [header.index(c) for c in FIELDS], stats)
+
+
+def _dedup(rows, idx, stats):
+    seen = BloomFilter(DEDUP_CAPACITY, DEDUP_FP_RATE)
+    dropped = 0
+    try:
+        for row in rows:
+            try:
+                fp = fingerprint(row, idx)
+            except IndexError:
+                # short rows are the mapper's to count and skip
+                yield row
+                continue
+            if seen.add(fp):
+                dropped += 1
+                continue
+            yield row
+    finally:
+        fp_rate = seen.fp_rate()
+        stats.incr("duplicates_dropped", dropped)
+        stats.incr("dedup_fp_ppm", round(fp_rate * 1e6))
+        full = " (over DEDUP_CAPACITY)" if seen.n > DEDUP_CAPACITY else ""
+        sys.stderr.write(
+            f"{stats.group}: dropped {dropped} duplicate reviews of {seen.n + dropped}; "
+            f"{seen.n} kept{full}, estimated false-positive rate {fp_rate:.2e}\n"
+        )
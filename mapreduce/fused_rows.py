@@ -0,0 +1,54 @@
+# Per-row rules of the six analyses, shared by mapper_fused.py and
+# incremental.py so the two cannot drift apart. route() yields what one CSV
+# row contributes, as (tag, key, value):
+#   wc/pos/neg  -> review text, to be tokenized in batches; value None
+#   cat/prob    -> category / product name; value 1
+#   avg         -> category (possibly empty); value the rating
+# Each analysis keeps the failure behaviour of its standalone mapper.
+COLUMNS = ("text", "rating", "category", "product_name")
+TEXT_TAGS = ("wc", "pos", "neg")
+
+
+def column_index(header):
+    # ValueError if the header lacks one of COLUMNS
+    return [header.index(c) for c in COLUMNS]
+
+
+def route(row, idx, stats):
+    text_idx, rating_idx, cat_idx, prod_idx = idx
+    try:
+        text = row[text_idx]
+    except IndexError:
+        text = None
+        stats.incr("skipped_short_row")
+    try:
+        rating = int(row[rating_idx])
+    except IndexError:
+        rating = None
+    except ValueError:
+        rating = None
+        stats.incr("skipped_bad_rating")
+
+    if text is not None:
+        yield "wc", text, None
+        if rating is not None and rating >= 4:
+            yield "pos", text, None
+        if rating is not None and rating <= 2:
+            yield "neg", text, None
+
+    try:
+        cat = row[cat_idx].strip()
+    except IndexError:
+        cat = None
+    if cat:
+        yield "cat", cat, 1
+    if cat is not None and rating is not None:
+        yield "avg", cat, rating
+
+    if rating is not None and rating <= 2:
+        try:
+            product = row[prod_idx].strip()
+        except IndexError:
+            product = ""
+        if product:
+            yield "prob", product, 1
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""Incremental refresh of the six outputs/*.csv files for an append-only dataset.
+
+    TOPN=50 python mapreduce/incremental.py reviews.csv [--state FILE] [--rebuild]
+
+Full aggregate state (all word counts, category counts, per-category rating
+histograms, product negative counts) is kept in a JSON state file next to the
+dataset, together with a watermark: the byte offset of the last complete
+record processed and checksums of the bytes around it. A run parses only the
+rows after the watermark, merges them into the state and rewrites the
+outputs from it. If the dataset was rewritten rather than appended to, the
+checksums no longer match and the state is rebuilt from the start.
+
+Rows are classified by fused_rows.py and the outputs are written by
+reducer_fused_csv.py, so they match a full mapper_fused.py run: OUTPUT_DIR,
+TOPN, WRITE_HEADER, RATING_COLUMNS, OUTPUT_COMPRESSION and SNAPSHOT work the
+same way.
+"""
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+
+from fused_rows import TEXT_TAGS, column_index, route
+from rating_histogram import add
+from reducer_fused_csv import COUNTER_OUTPUTS, write_outputs
+from stream_io import atomic_write
+from task_stats import start_task
+from tokenizer import tokenize_batch
+
+# version 1 kept a rating sum/count per category; an older state file is
+# ignored, which rebuilds it from the start of the dataset
+STATE_VERSION = 2
+CHECK_BYTES = 64 * 1024
+READ_BLOCK = 64 * 1024 * 1024
+
+
+def empty_state():
+    return {
+        "version": STATE_VERSION,
+        "watermark": {"offset": 0, "head_sha1": "", "tail_sha1": ""},
+        "rows": 0,
+        "counts": {tag: {} for tag in COUNTER_OUTPUTS},
+        "hists": {},
+    }
+
+
+def load_state(path):
+    if not os.path.exists(path):
+        return empty_state()
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    if state.get("version") != STATE_VERSION:
+        return empty_state()
+    # JSON object keys are strings; ratings are ints everywhere else
+    state["hists"] = {cat: {int(r): n for r, n in h.items()} for cat, h in state["hists"].items()}
+    return state
+
+
+def save_state(state, path):
+    with atomic_write(path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def sha1_range(f, start, end):
+    f.seek(start)
+    return hashlib.sha1(f.read(end - start)).hexdigest()
+
+
+def watermark_at(f, offset):
+    return {
+        "offset": offset,
+        "head_sha1": sha1_range(f, 0, min(offset, CHECK_BYTES)),
+        "tail_sha1": sha1_range(f, max(0, offset - CHECK_BYTES), offset),
+    }
+
+
+def watermark_valid(f, size, wm):
+    if wm["offset"] == 0:
+        return True
+    if size < wm["offset"]:
+        return False
+    return watermark_at(f, wm["offset"]) == wm
+
+
+def read_header(f):
+    f.seek(0)
+    header = b""
+    while True:
+        line = f.readline()
+        header += line
+        if not line or header.count(b'"') % 2 == 0:
+            return header, f.tell()
+
+
+def last_record_end(data):
+    # offset just past the last newline outside quotes; data starts on a
+    # record boundary, so quote parity starts even
+    end, parity, i = 0, 0, 0
+    while True:
+        nl = data.find(b"\n", i)
+        if nl < 0:
+            return end
+        parity ^= data.count(b'"', i, nl) & 1
+        i = nl + 1
+        if parity == 0:
+            end = i
+
+
+def apply_rows(state, rows, idx, stats):
+    counts, hists = state["counts"], state["hists"]
+    batches = {tag: [] for tag in TEXT_TAGS}
+    n = 0
+    for row in rows:
+        n += 1
+        for tag, key, value in route(row, idx, stats):
+            if tag in batches:
+                batches[tag].append(key)
+            elif tag == "avg":
+                add(hists.setdefault(key, {}), [(value, 1)])
+            else:
+                c = counts[tag]
+                c[key] = c.get(key, 0) + value
+
+    for tag, texts in batches.items():
+        c = counts[tag]
+        for w in tokenize_batch(texts):
+            c[w] = c.get(w, 0) + 1
+    state["rows"] += n
+    return n
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("input", help="review CSV (append-only)")
+    ap.add_argument("--state", help="state file (default: <input>.state.json)")
+    ap.add_argument("--rebuild", action="store_true", help="ignore saved state")
+    args = ap.parse_args()
+    stats = start_task("incremental")
+    state_path = args.state or args.input + ".state.json"
+
+    t0 = time.perf_counter()
+    state = empty_state() if args.rebuild else load_state(state_path)
+    size = os.path.getsize(args.input)
+
+    with open(args.input, "rb") as f:
+        header, data_start = read_header(f)
+        if not watermark_valid(f, size, state["watermark"]):
+            sys.stderr.write("incremental: dataset changed before the watermark, rebuilding\n")
+            state = empty_state()
+
+        columns = next(csv.reader(io.StringIO(header.decode("utf-8"), newline="")), [])
+        idx = column_index(columns)
+
+        offset = max(state["watermark"]["offset"], data_start)
+        new_rows = 0
+        while offset < size:
+            f.seek(offset)
+            data = f.read(READ_BLOCK)
+            end = last_record_end(data)
+            while end == 0:
+                # a record longer than the block; keep reading
+                more = f.read(READ_BLOCK)
+                if not more:
+                    break
+                data += more
+                end = last_record_end(data)
+            if end == 0:
+                break  # trailing record not terminated yet
+            text = data[:end].decode("utf-8")
+            new_rows += apply_rows(state, csv.reader(io.StringIO(text, newline="")), idx, stats)
+            offset += end
+
+        state["watermark"] = watermark_at(f, offset)
+
+    save_state(state, state_path)
+    write_outputs(state["counts"], state["hists"])
+    stats.incr("rows_read", new_rows)
+    sys.stderr.write(
+        f"incremental: {new_rows:,} new rows, {state['rows']:,} total, "
+        f"watermark {offset:,}/{size:,} bytes, {time.perf_counter() - t0:.2f}s\n"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import base64
+import hashlib
+import zlib
+
+from local_counter import LocalCounter
+
+# Fixed-width keys for jobs whose natural keys are long strings (n-gram
+# phrases, product names). Keys become 11-character ids (64-bit blake2b,
+# base64url); the text travels once per mapper as a third field on the first
+# record of its id. That is the side dictionary reducer_decode_topn_csv.py
+# resolves the top-N ids with, so the shuffle sorts and moves short keys.
+# The CRCs kept to spot collisions on ids already sent are capped at the
+# counter's max_keys and then forgotten, so an id seen again later carries its
+# text once more; the reducer accepts repeats.
+
+
+def key_id(text):
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+    return base64.urlsafe_b64encode(digest)[:11].decode("ascii")
+
+
+class EncodingCounter(LocalCounter):
+    def __init__(self, out=None):
+        super().__init__(out=out)
+        self.texts = {}  # id -> text not emitted yet
+        self.sent = {}  # id -> crc32 of the text already emitted
+        self.collisions = 0
+
+    def add_text(self, text, n=1):
+        key = key_id(text)
+        known = self.texts.get(key)
+        if known is None:
+            crc = self.sent.get(key)
+            if crc is None:
+                self.texts[key] = text
+            elif crc != zlib.crc32(text.encode("utf-8")):
+                self.collisions += 1
+        elif known != text:
+            self.collisions += 1
+        self.add(key, n)
+
+    def _emit(self, items):
+        write = self.out.write
+        for k, c in items:
+            text = self.texts.pop(k, None)
+            if text is None:
+                write(f"{k}\t{c}\n")
+            else:
+                if len(self.sent) >= self.max_keys:
+                    self.sent.clear()
+                self.sent[k] = zlib.crc32(text.encode("utf-8"))
+                write(f"{k}\t{c}\t{text}\n")
@@ -0,0 +1,50 @@
+import os
+import sys
+
+# In-mapper combining: aggregate `key\t1` records locally before they hit the
+# shuffle. Enabled with COMBINE=1; limits are per mapper task.
+COMBINE = os.environ.get("COMBINE", "0") == "1"
+COMBINE_MAX_KEYS = int(os.environ.get("COMBINE_MAX_KEYS", "200000"))
+COMBINE_MAX_BYTES = int(os.environ.get("COMBINE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# rough per-entry cost of a dict slot + str + int object
+ENTRY_OVERHEAD = 120
+
+
+class LocalCounter:
+    def __init__(self, max_keys=COMBINE_MAX_KEYS, max_bytes=COMBINE_MAX_BYTES, out=None):
+        self.max_keys = max_keys
+        self.max_bytes = max_bytes
+        self.out = out or sys.stdout
+        self.counts = {}
+        self.nbytes = 0
+
+    def add(self, key, n=1):
+        counts = self.counts
+        if key in counts:
+            counts[key] += n
+            return
+        counts[key] = n
+        self.nbytes += len(key) + ENTRY_OVERHEAD
+        if len(counts) >= self.max_keys or self.nbytes >= self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        # under pressure, emit and drop the coldest half; hot keys stay resident
+        # so they keep absorbing increments
+        items = sorted(self.counts.items(), key=lambda x: x[1])
+        cold = items[: max(1, len(items) // 2)]
+        self._emit(cold)
+        for k, _ in cold:
+            del self.counts[k]
+            self.nbytes -= len(k) + ENTRY_OVERHEAD
+
+    def flush(self):
+        self._emit(self.counts.items())
+        self.counts = {}
+        self.nbytes = 0
+
+    def _emit(self, items):
+        write = self.out.write
+        for k, c in items:
+            write(f"{k}\t{c}\n")
@@ -1,18 +1,50 @@
 #!/usr/bin/env python3
 import sys, csv
+from dedup import dedup_rows
+from local_counter import COMBINE, COMBINE_MAX_KEYS
+from rating_histogram import write_partial
+from salting import salter
+from sampling import sample_lines
+from stream_io import Emitter
+from task_stats import start_task
 
-reader = csv.reader(sys.stdin)
+stats = start_task("mapper_avg_rating_category")
+
+reader = csv.reader(sample_lines(sys.stdin))
 header = next(reader, None)
 if not header:
     sys.exit(0)
 
 cat_idx = header.index("category")
 rating_idx = header.index("rating")
+out = Emitter()
+salting = salter()  # None unless SALT_BUCKETS is set
+# COMBINE=1 keeps a rating histogram per category and emits one record per
+# category at the end instead of one per review
+hists = {} if COMBINE else None
 
-for row in reader:
+for row in dedup_rows(stats.rows(reader), header, stats):
     try:
         cat = row[cat_idx].strip()
         rating = int(row[rating_idx])
-        print(f"{cat}\t{rating}")
-    except:
-        pass
+    except IndexError:
+        stats.incr("skipped_short_row")
+        continue
+    except ValueError:
+        stats.incr("skipped_bad_rating")
+        continue
+    if salting is not None:
+        cat = salting.salt(cat)
+    if hists is None:
+        out.emit(cat, rating)
+        continue
+    hist = hists.get(cat)
+    if hist is None:
+        if len(hists) >= COMBINE_MAX_KEYS:
+            write_partial(hists)
+            hists.clear()
+        hist = hists[cat] = {}
+    hist[rating] = hist.get(rating, 0) + 1
+
+if hists:
+    write_partial(hists)
@@ -1,16 +1,27 @@
 import sys, csv
+from dedup import dedup_rows
+from salting import salter
+from sampling import sample_lines
+from stream_io import Emitter
+from task_stats import start_task
 
-reader = csv.reader(sys.stdin)
+stats = start_task("mapper_category_count")
+
+reader = csv.reader(sample_lines(sys.stdin))
 header = next(reader, None)
 if not header:
     sys.exit(0)
 
 cat_idx = header.index("category")
+out = Emitter()
+salting = salter()  # None unless SALT_BUCKETS is set
 
-for row in reader:
+for row in dedup_rows(stats.rows(reader), header, stats):
     try:
         cat = row[cat_idx].strip()
         if cat:
-            print(f"{cat}\t1")
-    except:
-        pass
+            out.emit(cat if salting is None else salting.salt(cat))
+        else:
+            stats.incr("skipped_empty_category")
+    except IndexError:
+        stats.incr("skipped_short_row")
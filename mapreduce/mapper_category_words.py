@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# (category, rating, word) counts for the per-category word matrix
+# (word_matrix.py): `word\tcategory\trating\t1` for every token of a review.
+# The shuffle key is the word; reduce with reducer_category_words.py.
+import sys, csv
+from dedup import dedup_rows
+from local_counter import COMBINE, LocalCounter
+from sampling import sample_lines
+from stream_io import Emitter
+from task_stats import start_task
+from tokenizer import tokenize
+
+stats = start_task("mapper_category_words")
+
+reader = csv.reader(sample_lines(sys.stdin))
+header = next(reader, None)
+if not header:
+    sys.exit(0)
+
+text_idx = header.index("text")
+rating_idx = header.index("rating")
+cat_idx = header.index("category")
+out = Emitter()
+counter = LocalCounter() if COMBINE else None
+
+for row in dedup_rows(stats.rows(reader), header, stats):
+    try:
+        rating = int(row[rating_idx])
+        cat = row[cat_idx].strip()
+        text = row[text_idx]
+    except IndexError:
+        stats.incr("skipped_short_row")
+        continue
+    except ValueError:
+        stats.incr("skipped_bad_rating")
+        continue
+    if not cat:
+        stats.incr("skipped_empty_category")
+        continue
+    words = tokenize(text)
+    stats.incr("tokens", len(words))
+    suffix = f"\t{cat}\t{rating}"
+    if counter is None:
+        out.emit_ones([w + suffix for w in words])
+        continue
+    for w in words:
+        counter.add(w + suffix)
+
+if counter is not None:
+    counter.flush()
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# Exact global dedup, map side: keys every review by its fingerprint (see
+# dedup.py) and carries the record as a JSON list, so multi-line text survives
+# the line-based shuffle. The header goes under the empty key, which sorts
+# first. Reduce with reducer_dedup.py (one reducer, LC_ALL=C sort locally):
+#   python mapreduce/mapper_dedup.py < reviews.csv | LC_ALL=C sort \
+#       | python mapreduce/reducer_dedup.py > reviews_dedup.csv
+import sys, csv, json
+from dedup import FIELDS, fingerprint
+from stream_io import Emitter
+from task_stats import start_task
+
+stats = start_task("mapper_dedup")
+
+reader = csv.reader(sys.stdin)
+header = next(reader, None)
+if not header:
+    sys.exit(0)
+
+idx = [header.index(c) for c in FIELDS]
+out = Emitter()
+out.emit("", json.dumps(header, ensure_ascii=False))
+
+for row in stats.rows(reader):
+    try:
+        fp = fingerprint(row, idx)
+    except IndexError:
+        stats.incr("skipped_short_row")
+        continue
+    out.emit(fp.hex(), json.dumps(row, ensure_ascii=False))
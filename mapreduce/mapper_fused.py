@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# Single-scan mapper for all six analyses. Every record key is prefixed with a
+# tag naming the analysis it belongs to (see reducer_fused_csv.py):
+#   wc:<word>  pos:<word>  neg:<word>  cat:<category>  prob:<product>  -> 1
+#   avg:<category>                                                     -> rating
+# The per-row rules are in fused_rows.py, shared with incremental.py.
+import sys, csv
+from dedup import dedup_rows
+from fused_rows import TEXT_TAGS, column_index, route
+from local_counter import COMBINE, LocalCounter
+from sampling import sample_lines
+from stream_io import Emitter
+from task_stats import start_task
+
+stats = start_task("mapper_fused")
+
+reader = csv.reader(sample_lines(sys.stdin))
+header = next(reader, None)
+if not header:
+    sys.exit(0)
+
+idx = column_index(header)
+counter = LocalCounter() if COMBINE else None
+out = Emitter(counter=counter, stats=stats)
+
+
+def emit(key):
+    if counter is not None:
+        counter.add(key)
+    else:
+        out.emit(key)
+
+
+for row in dedup_rows(stats.rows(reader), header, stats):
+    for tag, key, value in route(row, idx, stats):
+        if tag in TEXT_TAGS:
+            out.emit_text(key, prefix=f"{tag}:")
+        elif tag == "avg":
+            out.emit(f"avg:{key}", value)
+        else:
+            emit(f"{tag}:{key}")
+
+out.flush()
@@ -1,20 +1,32 @@
-import sys, csv, re
+import sys, csv
+from dedup import dedup_rows
+from local_counter import COMBINE, LocalCounter
+from salting import salter
+from sampling import sample_lines
+from sketch import SKETCH, SpaceSaving
+from stream_io import Emitter
+from task_stats import start_task
 
-reader = csv.reader(sys.stdin)
+stats = start_task("mapper_negative_words")
+
+reader = csv.reader(sample_lines(sys.stdin))
 header = next(reader, None)
 if not header:
     sys.exit(0)
 
 text_idx = header.index("text")
 rating_idx = header.index("rating")
+counter = SpaceSaving() if SKETCH else LocalCounter() if COMBINE else None
+# salter() is None unless SALT_BUCKETS is set
+out = Emitter(counter=counter, salting=salter(), stats=stats)
 
-for row in reader:
+for row in dedup_rows(stats.rows(reader), header, stats):
     try:
         rating = int(row[rating_idx])
         if rating <= 2:
-            text = re.sub(r'[^a-z\s]', ' ', row[text_idx].lower())
-            for w in text.split():
-                if len(w) > 2:
-                    print(f"{w}\t1")
-    except:
-        pass
+            out.emit_text(row[text_idx])
+    except IndexError:
+        stats.incr("skipped_short_row")
+    except ValueError:
+        stats.incr("skipped_bad_rating")
+out.flush()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# Hashed n-gram phrases ("tidak sesuai", "barang rusak") with in-mapper
+# aggregation. Keys are fixed-width ids with each phrase sent once per mapper
+# (see key_codec.py); reduce with reducer_decode_topn_csv.py.
+#   NGRAM_N=2|3   NGRAM_RATINGS=negative (<= 2) | positive (>= 4) | all
+import sys, csv, os
+from dedup import dedup_rows
+from key_codec import EncodingCounter
+from sampling import sample_lines
+from task_stats import start_task
+from tokenizer import tokenize
+
+stats = start_task("mapper_ngrams")
+
+NGRAM_N = int(os.environ.get("NGRAM_N", "2"))
+NGRAM_RATINGS = os.environ.get("NGRAM_RATINGS", "negative")
+
+reader = csv.reader(sample_lines(sys.stdin))
+header = next(reader, None)
+if not header:
+    sys.exit(0)
+
+text_idx = header.index("text")
+rating_idx = header.index("rating")
+counter = EncodingCounter()
+
+for row in dedup_rows(stats.rows(reader), header, stats):
+    try:
+        if NGRAM_RATINGS != "all":
+            rating = int(row[rating_idx])
+            if NGRAM_RATINGS == "negative" and rating > 2:
+                continue
+            if NGRAM_RATINGS == "positive" and rating < 4:
+                continue
+        tokens = tokenize(row[text_idx])
+        for i in range(len(tokens) - NGRAM_N + 1):
+            counter.add_text(" ".join(tokens[i:i + NGRAM_N]))
+        stats.incr("phrases", max(0, len(tokens) - NGRAM_N + 1))
+    except IndexError:
+        stats.incr("skipped_short_row")
+    except ValueError:
+        stats.incr("skipped_bad_rating")
+
+counter.flush()
+stats.incr("hash_collisions", counter.collisions)
+if counter.collisions:
+    sys.stderr.write(f"mapper_ngrams: {counter.collisions} hash collisions\n")
@@ -1,19 +1,48 @@
-import sys, csv
+import sys, csv, os
+from dedup import dedup_rows
+from key_codec import EncodingCounter
+from local_counter import COMBINE, LocalCounter
+from sampling import sample_lines
+from stream_io import Emitter
+from task_stats import start_task
 
-reader = csv.reader(sys.stdin)
+# ENCODE_KEYS=1 shuffles fixed-width product ids instead of the names (see
+# key_codec.py); reduce with reducer_decode_topn_csv.py for the same CSV
+ENCODE_KEYS = os.environ.get("ENCODE_KEYS", "0") == "1"
+
+stats = start_task("mapper_problem_products")
+
+reader = csv.reader(sample_lines(sys.stdin))
 header = next(reader, None)
 if not header:
     sys.exit(0)
 
 prod_idx = header.index("product_name")
 rating_idx = header.index("rating")
+out = Emitter()
+counter = EncodingCounter() if ENCODE_KEYS else LocalCounter() if COMBINE else None
 
-for row in reader:
+for row in dedup_rows(stats.rows(reader), header, stats):
     try:
         rating = int(row[rating_idx])
         if rating <= 2:
             product = row[prod_idx].strip()
-            if product:
-                print(f"{product}\t1")
-    except:
-        pass
+            if not product:
+                stats.incr("skipped_empty_product")
+            elif ENCODE_KEYS:
+                counter.add_text(product)
+            elif counter is not None:
+                counter.add(product)
+            else:
+                out.emit(product)
+    except IndexError:
+        stats.incr("skipped_short_row")
+    except ValueError:
+        stats.incr("skipped_bad_rating")
+
+if counter is not None:
+    counter.flush()
+if ENCODE_KEYS:
+    stats.incr("hash_collisions", counter.collisions)
+    if counter.collisions:
+        sys.stderr.write(f"mapper_problem_products: {counter.collisions} hash collisions\n")
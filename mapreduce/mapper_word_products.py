@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# Word -> product postings for low-rated reviews (rating <= 2), the input of
+# the complaint-word index (word_index.py). One record per distinct word of a
+# review: `word\tproduct\t1`. The shuffle key is the word alone, so all of a
+# word's products meet in one reducer; reduce with reducer_word_products.py.
+import sys, csv
+from dedup import dedup_rows
+from local_counter import COMBINE, LocalCounter
+from sampling import sample_lines
+from stream_io import Emitter
+from task_stats import start_task
+from tokenizer import tokenize
+
+stats = start_task("mapper_word_products")
+
+reader = csv.reader(sample_lines(sys.stdin))
+header = next(reader, None)
+if not header:
+    sys.exit(0)
+
+text_idx = header.index("text")
+rating_idx = header.index("rating")
+prod_idx = header.index("product_name")
+out = Emitter()
+counter = LocalCounter() if COMBINE else None
+
+for row in dedup_rows(stats.rows(reader), header, stats):
+    try:
+        if int(row[rating_idx]) > 2:
+            continue
+        product = row[prod_idx].strip()
+        text = row[text_idx]
+    except IndexError:
+        stats.incr("skipped_short_row")
+        continue
+    except ValueError:
+        stats.incr("skipped_bad_rating")
+        continue
+    if not product:
+        stats.incr("skipped_empty_product")
+        continue
+    words = set(tokenize(text))
+    stats.incr("postings", len(words))
+    if counter is None:
+        out.emit_ones([f"{w}\t{product}" for w in words])
+        continue
+    for w in words:
+        counter.add(f"{w}\t{product}")
+
+if counter is not None:
+    counter.flush()
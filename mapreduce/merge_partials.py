@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""Final merge stage for jobs run with several reducers in PARTIAL=1 mode.
+
+    TOPN=50 python mapreduce/merge_partials.py counter part-* > outputs/wordcount.csv
+    python mapreduce/merge_partials.py avg part-* > outputs/avg_rating_category.csv
+    python mapreduce/merge_partials.py fused part-*
+
+Reads the partition files given (or stdin) and writes the same CSV the single
+reducer would have written for sorted input; TOPN, HEADER, SQLITE_DB,
+SQLITE_TABLE and APPROX_ERROR_COLUMN work as in reducer_topn_counter_csv.py,
+whose APPROX=1 partial summaries are merged too; RATING_COLUMNS as in
+rating_histogram.py. Keys salted by the mappers (salting.py) are merged back
+into their plain key. `fused` writes the six outputs of reducer_fused_csv.py
+to OUTPUT_DIR from its PARTIAL=1 part files.
+"""
+import sys
+import csv
+import os
+import fileinput
+
+from rating_histogram import add, parse_value, write_summary
+from reducer_fused_csv import read_tagged, write_outputs
+from salting import unsalt
+from sampling import scale
+from sketch import MIN_KEY, csv_header, parse_record
+from sqlite_store import top, write_counts
+from task_stats import start_task
+
+TOPN = int(os.environ.get("TOPN", "50"))
+SQLITE_DB = os.environ.get("SQLITE_DB", "")
+SQLITE_TABLE = os.environ.get("SQLITE_TABLE", "counts")
+APPROX_ERROR_COLUMN = os.environ.get("APPROX_ERROR_COLUMN", "0") == "1"
+
+
+def merge_counter(lines, stats):
+    # Space-Saving records (APPROX=1 PARTIAL=1 reducers) are merged as in
+    # read_sketch of reducer_topn_counter_csv.py: relative to their summary's
+    # min, plus the floor of all summaries. Exact partials have no min and
+    # no error, and the floor stays 0.
+    counts, errs, floor = {}, {}, 0
+    for line in stats.rows(lines, "records_read"):
+        line = line.rstrip("\r\n")
+        if not line:
+            stats.incr("skipped_blank")
+            continue
+        try:
+            key, c, e, m = parse_record(line)
+        except ValueError:
+            stats.incr("skipped_bad_value")
+            continue
+        if key == MIN_KEY:
+            floor += m
+            continue
+        counts[key] = counts.get(key, 0) + c - m
+        if e or m:
+            errs[key] = errs.get(key, 0) + e - m
+
+    # the floor bounds every salted key on its own, so it is added before the
+    # salt buckets of a key are summed
+    merged, merged_errs = {}, {}
+    for key, c in counts.items():
+        plain = unsalt(key)
+        merged[plain] = merged.get(plain, 0) + c + floor
+        merged_errs[plain] = merged_errs.get(plain, 0) + errs.get(key, 0) + floor
+
+    if SQLITE_DB:
+        write_counts(SQLITE_DB, SQLITE_TABLE, merged.items())
+        top_items = top(SQLITE_DB, SQLITE_TABLE, TOPN)
+    else:
+        # key order first, so ties come out as they do from one reducer fed
+        # by the sorted shuffle
+        top_items = sorted(sorted(merged.items()), key=lambda x: x[1], reverse=True)[:TOPN]
+
+    writer = csv.writer(sys.stdout)
+    header = csv_header(os.environ.get("HEADER", ""), APPROX_ERROR_COLUMN)
+    if header:
+        writer.writerow(header)
+    for k, c in top_items:
+        row = [k, scale(c)]
+        if APPROX_ERROR_COLUMN:
+            row.append(scale(merged_errs[k]))
+        writer.writerow(row)
+
+
+def merge_avg(lines, stats):
+    hists = {}
+    for line in stats.rows(lines, "records_read"):
+        line = line.rstrip("\r\n")
+        if not line:
+            stats.incr("skipped_blank")
+            continue
+        cat, tab, val = line.rpartition("\t")
+        try:
+            if not tab:
+                raise ValueError(line)
+            pairs = parse_value(val)
+        except ValueError:
+            stats.incr("skipped_bad_rating")
+            continue
+        add(hists.setdefault(unsalt(cat), {}), pairs)
+    write_summary(hists)
+
+
+def merge_fused(lines, stats):
+    # writes the six files to OUTPUT_DIR, nothing to stdout
+    write_outputs(*read_tagged(lines, stats))
+
+
+MODES = {"counter": merge_counter, "avg": merge_avg, "fused": merge_fused}
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in MODES:
+        sys.exit(f"usage: {sys.argv[0]} {{{','.join(MODES)}}} [partition files...]")
+    with fileinput.input(sys.argv[2:]) as lines:
+        MODES[sys.argv[1]](lines, start_task("merge_partials"))
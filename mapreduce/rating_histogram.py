@@ -0,0 +1,86 @@
+import csv
+import os
+import sys
+
+from sampling import PREVIEW, mean_ci, scale
+
+# Mergeable per-category rating histograms for the average-rating job.
+# Records are `category\trating` (one review) or `category\tr:n,r:n,...`
+# (n reviews with rating r); both merge by adding counts, so mappers
+# (COMBINE=1), combiners, PARTIAL=1 reducers and merge_partials.py can pass
+# them along in any number of stages without losing exactness.
+#
+# RATING_COLUMNS=median,distribution adds median_rating and rating_1..rating_5
+# columns after the usual category,avg_rating,review_count. Under sampling.py's
+# SAMPLE_RATE < 1 the counts are scaled estimates and ci_low,ci_high follow
+# review_count.
+RATING_COLUMNS = [c.strip() for c in os.environ.get("RATING_COLUMNS", "").split(",") if c.strip()]
+DISTRIBUTION = range(1, 6)
+
+
+def parse_value(val):
+    # [(rating, count), ...]; ValueError on anything else
+    if ":" not in val:
+        return [(int(val), 1)]
+    pairs = []
+    for item in val.split(","):
+        r, _, n = item.partition(":")
+        pairs.append((int(r), int(n)))
+    return pairs
+
+
+def add(hist, pairs):
+    for r, n in pairs:
+        hist[r] = hist.get(r, 0) + n
+
+
+def format_hist(hist):
+    return ",".join(f"{r}:{n}" for r, n in sorted(hist.items()))
+
+
+def write_partial(hists, out=None):
+    write = (out or sys.stdout).write
+    for cat, hist in hists.items():
+        write(f"{cat}\t{format_hist(hist)}\n")
+
+
+def median(hist, count):
+    # mean of the two middle ratings when count is even
+    lo, hi = (count - 1) // 2, count // 2
+    seen, low = 0, None
+    for r in sorted(hist):
+        seen += hist[r]
+        if low is None and seen > lo:
+            low = r
+        if seen > hi:
+            return (low + r) / 2
+
+
+def write_summary(hists, out=None):
+    rows = []
+    for cat, hist in sorted(hists.items()):
+        count = sum(hist.values())
+        avg = sum(r * n for r, n in hist.items()) / count if count else 0.0
+        rows.append((cat, avg, count, hist))
+    rows.sort(key=lambda x: x[1], reverse=True)
+
+    header = ["category", "avg_rating", "review_count"]
+    if PREVIEW:
+        header += ["ci_low", "ci_high"]
+    if "median" in RATING_COLUMNS:
+        header.append("median_rating")
+    if "distribution" in RATING_COLUMNS:
+        header += [f"rating_{r}" for r in DISTRIBUTION]
+
+    writer = csv.writer(out or sys.stdout)
+    writer.writerow(header)
+    for cat, avg, count, hist in rows:
+        row = [cat, f"{avg:.2f}", scale(count)]
+        if PREVIEW:
+            ci = mean_ci(hist, count, avg)
+            row += [f"{v:.2f}" for v in ci] if ci else ["", ""]
+        if "median" in RATING_COLUMNS:
+            row.append(f"{median(hist, count):.1f}" if count else "")
+        if "distribution" in RATING_COLUMNS:
+            row += [scale(hist.get(r, 0)) for r in DISTRIBUTION]
+        writer.writerow(row)
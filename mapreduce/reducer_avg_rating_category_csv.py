@@ -1,33 +1,43 @@
 #!/usr/bin/env python3
 import sys
-import csv
+import os
 
-sum_count = {}  # cat -> [sum, count]
+from rating_histogram import add, parse_value, write_partial, write_summary
+from salting import unsalt
+from task_stats import start_task
 
-for line in sys.stdin:
+stats = start_task("reducer_avg_rating_category_csv")
+
+# Input is `category\trating` or rating-histogram records (see
+# rating_histogram.py). PARTIAL=1, or the --combine argument when this runs as
+# the Hadoop -combiner, writes merged `category\thistogram` records instead of
+# the CSV; merge_partials.py avg combines PARTIAL outputs. Categories salted
+# by the mapper (salting.py) stay salted there and are merged back otherwise.
+PARTIAL = os.environ.get("PARTIAL", "0") == "1" or "--combine" in sys.argv[1:]
+
+hists = {}  # cat -> {rating: count}
+
+for line in stats.rows(sys.stdin, "records_read"):
     line = line.strip()
     if not line:
+        stats.incr("skipped_blank")
         continue
-    cat, rating = line.split("\t", 1)
+    cat, _, val = line.partition("\t")
+    if not PARTIAL:
+        cat = unsalt(cat)
     try:
-        r = int(rating)
-    except:
+        pairs = parse_value(val)
+    except ValueError:
+        stats.incr("skipped_bad_rating")
         continue
 
-    if cat not in sum_count:
-        sum_count[cat] = [0, 0]
-    sum_count[cat][0] += r
-    sum_count[cat][1] += 1
-
-rows = []
-for cat, (s, c) in sum_count.items():
-    avg = s / c if c else 0.0
-    rows.append((cat, avg, c))
+    hist = hists.get(cat)
+    if hist is None:
+        hist = hists[cat] = {}
+    add(hist, pairs)
 
-# sort by avg desc
-rows.sort(key=lambda x: x[1], reverse=True)
+if PARTIAL:
+    write_partial(hists)
+    sys.exit(0)
 
-writer = csv.writer(sys.stdout)
-writer.writerow(["category", "avg_rating", "review_count"])
-for cat, avg, c in rows:
-    writer.writerow([cat, f"{avg:.2f}", c])
+write_summary(hists)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# Reducer for mapper_category_words.py: sums each word's counts per
+# (category, rating) and writes one line per word,
+# `word\t[[category, rating, count], ...]`, for word_matrix.py build. Words
+# with fewer than MIN_COUNT tokens in total are dropped to keep the
+# vocabulary small.
+import sys
+import json
+import os
+
+from sampling import scale
+from task_stats import start_task
+
+stats = start_task("reducer_category_words")
+
+MIN_COUNT = int(os.environ.get("MIN_COUNT", "1"))
+write = sys.stdout.write
+
+
+def flush(word, cells):
+    if sum(cells.values()) < MIN_COUNT:
+        stats.incr("words_below_min_count")
+        return
+    items = [[cat, rating, scale(c)] for (cat, rating), c in sorted(cells.items())]
+    write(f"{word}\t{json.dumps(items, ensure_ascii=False)}\n")
+
+
+prev, cells = None, {}
+for line in stats.rows(sys.stdin, "records_read"):
+    line = line.rstrip("\r\n")
+    if not line:
+        stats.incr("skipped_blank")
+        continue
+    word, _, rest = line.partition("\t")
+    rest, _, val = rest.rpartition("\t")
+    cat, _, rating = rest.rpartition("\t")
+    try:
+        key, c = (cat, int(rating)), int(val)
+    except ValueError:
+        stats.incr("skipped_bad_value")
+        continue
+    if word != prev:
+        if prev is not None:
+            if word < prev:
+                sys.exit("reducer_category_words: input must be sorted by word")
+            flush(prev, cells)
+        prev, cells = word, {}
+    cells[key] = cells.get(key, 0) + c
+if prev is not None:
+    flush(prev, cells)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# Top-N reducer for id-encoded keys (key_codec.py: mapper_ngrams.py,
+# mapper_problem_products.py with ENCODE_KEYS=1). Sums runs of equal ids from
+# the sorted shuffle, picks up each id's text from the record that carries it,
+# and keeps a TOPN-sized heap of (count, text), so only the surviving ids are
+# ever held as text. Ties are cut by text, so the CSV is the one
+# reducer_topn_counter_csv.py writes for the unencoded keys.
+import sys
+import csv
+import os
+import heapq
+
+from sampling import scale
+from task_stats import start_task
+
+stats = start_task("reducer_decode_topn_csv")
+
+TOPN = int(os.environ.get("TOPN", "50"))
+
+
+class Desc:
+    # reversed string order: the heap root is the largest text among the
+    # lowest counts, the one a sorted-key reducer would cut first
+    __slots__ = ("text",)
+
+    def __init__(self, text):
+        self.text = text
+
+    def __lt__(self, other):
+        return self.text > other.text
+
+    def __eq__(self, other):
+        return self.text == other.text
+
+
+heap = []
+collisions = 0
+
+
+def push(key, count, text):
+    if TOPN <= 0:
+        return
+    entry = (count, Desc(text if text is not None else key))
+    if len(heap) < TOPN:
+        heapq.heappush(heap, entry)
+    elif heap[0] < entry:
+        heapq.heapreplace(heap, entry)
+
+
+prev, total, text = None, 0, None
+for line in stats.rows(sys.stdin, "records_read"):
+    line = line.rstrip("\r\n")
+    if not line:
+        stats.incr("skipped_blank")
+        continue
+    parts = line.split("\t", 2)
+    try:
+        key, c = parts[0], int(parts[1])
+    except (IndexError, ValueError):
+        stats.incr("skipped_bad_value")
+        continue
+
+    if key != prev:
+        if prev is not None:
+            if key < prev:
+                sys.exit("reducer_decode_topn_csv: input must be sorted by key")
+            push(prev, total, text)
+        prev, total, text = key, 0, None
+    total += c
+    if len(parts) > 2:
+        if text is None:
+            text = parts[2]
+        elif text != parts[2]:
+            collisions += 1
+if prev is not None:
+    push(prev, total, text)
+
+heap.sort(key=lambda x: (-x[0], x[1].text))
+
+writer = csv.writer(sys.stdout)
+header = os.environ.get("HEADER", "")
+if header:
+    writer.writerow([h.strip() for h in header.split(",")])
+for count, text in heap:
+    writer.writerow([text.text, scale(count)])
+
+stats.incr("hash_collisions", collisions)
+if collisions:
+    sys.stderr.write(f"reducer_decode_topn_csv: {collisions} ids with conflicting texts\n")
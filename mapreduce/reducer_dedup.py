@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# Exact global dedup, reduce side (see mapper_dedup.py): writes the header and
+# the first record of every fingerprint back as CSV, the input format of the
+# analysis mappers. Needs the whole sorted shuffle in one reducer, so the
+# header (empty key) comes first and is written once.
+import sys
+import csv
+import json
+
+from task_stats import start_task
+
+stats = start_task("reducer_dedup")
+
+writer = csv.writer(sys.stdout)
+prev = None
+for line in stats.rows(sys.stdin, "records_read"):
+    line = line.rstrip("\r\n")
+    if not line:
+        stats.incr("skipped_blank")
+        continue
+    key, _, val = line.partition("\t")
+    if key == prev:
+        stats.incr("duplicates_dropped")
+        continue
+    if prev is None and key != "":
+        sys.exit("reducer_dedup: the header record must come first; sort the input with LC_ALL=C")
+    if prev is not None and key < prev:
+        sys.exit("reducer_dedup: input must be sorted by key")
+    prev = key
+    try:
+        writer.writerow(json.loads(val))
+    except ValueError:
+        stats.incr("skipped_bad_value")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# Demultiplexing reducer for mapper_fused.py: routes each tagged key to its
+# analysis and writes the six outputs/*.csv files in their usual formats.
+#
+# The files go to a local OUTPUT_DIR, so this mode is local only: inside a
+# Hadoop task they would land in the task's scratch directory, and several
+# reducers would each write a partial top-N. On the cluster run it with
+# PARTIAL=1, which writes the merged tagged records to stdout instead, and
+# write the outputs locally from the part files with merge_partials.py fused
+# (or run_local.py -r N --merge fused):
+#   hdfs dfs -cat out/part-* | python mapreduce/merge_partials.py fused
+import sys
+import csv
+import heapq
+import os
+
+from rating_histogram import add, format_hist, parse_value, write_summary
+from sampling import scale
+from snapshot import SNAPSHOT, publish
+from stream_io import open_output_file
+from task_stats import TASK_ID, start_task
+
+TOPN = int(os.environ.get("TOPN", "50"))
+OUTPUT_DIR = os.environ.get("OUTPUT_DIR", "outputs")
+# the standalone counter jobs run without HEADER; set WRITE_HEADER=1 to add one
+WRITE_HEADER = os.environ.get("WRITE_HEADER", "0") == "1"
+PARTIAL = os.environ.get("PARTIAL", "0") == "1"
+
+COUNTER_OUTPUTS = {
+    "wc": ("wordcount.csv", ["word", "count"]),
+    "pos": ("positive_words.csv", ["word", "count"]),
+    "neg": ("negative_words.csv", ["word", "count"]),
+    "cat": ("category_count.csv", ["category", "review_count"]),
+    "prob": ("problem_products.csv", ["product_name", "negative_review_count"]),
+}
+AVG_OUTPUT = "avg_rating_category.csv"
+
+
+def read_tagged(lines, stats):
+    counts = {tag: {} for tag in COUNTER_OUTPUTS}
+    hists = {}  # cat -> {rating: count}
+    for line in stats.rows(lines, "records_read"):
+        line = line.strip()
+        if not line:
+            stats.incr("skipped_blank")
+            continue
+        key, _, val = line.partition("\t")
+        tag, _, key = key.partition(":")
+        try:
+            # avg values are a rating, or a histogram from a PARTIAL=1 run
+            v = parse_value(val) if tag == "avg" else int(val)
+        except ValueError:
+            stats.incr("skipped_bad_value")
+            continue
+
+        if tag == "avg":
+            hist = hists.get(key)
+            if hist is None:
+                hist = hists[key] = {}
+            add(hist, v)
+        elif tag in counts:
+            c = counts[tag]
+            c[key] = c.get(key, 0) + v
+        else:
+            stats.incr("skipped_unknown_tag")
+    return counts, hists
+
+
+def write_tagged(counts, hists):
+    write = sys.stdout.write
+    for tag, c in counts.items():
+        for k, v in c.items():
+            write(f"{tag}:{k}\t{v}\n")
+    for cat, hist in hists.items():
+        write(f"avg:{cat}\t{format_hist(hist)}\n")
+
+
+def top_n(counts):
+    # highest counts, ties in key order, so the result does not depend on
+    # the order keys arrived in (sorted input, PARTIAL part files, state)
+    return heapq.nsmallest(TOPN, counts.items(), key=lambda x: (-x[1], x[0]))
+
+
+def write_outputs(counts, hists):
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    for tag, (filename, header) in COUNTER_OUTPUTS.items():
+        top_items = top_n(counts[tag])
+        with open_output_file(os.path.join(OUTPUT_DIR, filename)) as f:
+            writer = csv.writer(f)
+            if WRITE_HEADER:
+                writer.writerow(header)
+            for k, c in top_items:
+                writer.writerow([k, scale(c)])
+
+    with open_output_file(os.path.join(OUTPUT_DIR, AVG_OUTPUT)) as f:
+        write_summary(hists, f)
+
+    if SNAPSHOT:
+        publish(OUTPUT_DIR)
+
+
+if __name__ == "__main__":
+    if TASK_ID and not PARTIAL:
+        sys.exit("reducer_fused_csv: writes local files; run with PARTIAL=1 inside a Hadoop job")
+    stats = start_task("reducer_fused_csv")
+    counts, hists = read_tagged(sys.stdin, stats)
+    if PARTIAL:
+        write_tagged(counts, hists)
+    else:
+        write_outputs(counts, hists)
@@ -1,27 +1,205 @@
 import sys
 import csv
 import os
+import heapq
+import tempfile
+
+from salting import SALT_SEP, unsalt
+from sampling import scale
+from sketch import MIN_KEY, SpaceSaving, csv_header, parse_record
+from sqlite_store import top, write_counts
+from task_stats import start_task
+
+stats = start_task("reducer_topn_counter_csv")
 
 TOPN = int(os.environ.get("TOPN", "50"))
+# STREAMING=1 sums runs of equal keys from sorted shuffle input and keeps only a
+# TOPN-sized heap. Out-of-order input falls back to the dict path (stdin is
+# rewound, or spooled to disk when it is a pipe). STREAMING=trusted skips the
+# spool for Hadoop, where the shuffle always delivers keys sorted.
+STREAMING = os.environ.get("STREAMING", "0")
+SPOOL_MAX_MEMORY = int(os.environ.get("SPOOL_MAX_MEMORY", str(8 * 1024 * 1024)))
+# PARTIAL=1 writes every key with its partial sum as `key\tcount` instead of the
+# top-N CSV, for jobs with several reducers; merge_partials.py combines them.
+# Keys salted by the mappers (salting.py) are kept salted there and merged back
+# into their plain key otherwise.
+PARTIAL = os.environ.get("PARTIAL", "0") == "1"
+# SQLITE_DB=path additionally stores every key in table SQLITE_TABLE of an
+# indexed SQLite file (see sqlite_store.py); the CSV still holds the top-N.
+SQLITE_DB = os.environ.get("SQLITE_DB", "")
+SQLITE_TABLE = os.environ.get("SQLITE_TABLE", "counts")
+# APPROX=1 replaces the exact counts dict with a SKETCH_CAPACITY-key
+# Space-Saving summary (see sketch.py). Counts become upper bounds;
+# APPROX_ERROR_COLUMN=1 adds a third column with the maximum overestimate,
+# named "error" in the header when HEADER gives only two names.
+APPROX = os.environ.get("APPROX", "0") == "1"
+APPROX_ERROR_COLUMN = os.environ.get("APPROX_ERROR_COLUMN", "0") == "1"
+
+
+class UnsortedInput(Exception):
+    pass
+
+
+def parse(lines):
+    # records_parsed counts a fallback re-read of the input twice
+    for line in stats.rows(lines, "records_parsed"):
+        line = line.strip()
+        if not line:
+            stats.incr("skipped_blank")
+            continue
+        key, _, val = line.partition("\t")
+        if SALT_SEP in key and not PARTIAL:
+            # the salt buckets of a key sort next to each other, so sorted
+            # input stays sorted
+            key = unsalt(key)
+        try:
+            yield key, int(val)
+        except ValueError:
+            if "\t" in val:
+                sys.exit("reducer_topn_counter_csv: Space-Saving records from SKETCH=1 mappers need APPROX=1")
+            stats.incr("skipped_bad_value")
+
+
+def top_from_dict(lines, limit=TOPN):
+    counts = {}
+    for key, val in parse(lines):
+        counts[key] = counts.get(key, 0) + val
+    if limit is None:
+        return counts.items()
+    return sorted(counts.items(), key=lambda x: x[1], reverse=True)[:limit]
+
+
+def sum_runs(lines, check_order=True):
+    prev, total = None, 0
+    for key, val in parse(lines):
+        if key == prev:
+            total += val
+            continue
+        if prev is not None:
+            if check_order and key < prev:
+                raise UnsortedInput(key)
+            yield prev, total
+        prev, total = key, val
+    if prev is not None:
+        yield prev, total
+
+
+def top_from_sorted(lines):
+    # heap entries are (count, -run_index, key): the root is the lowest count,
+    # and among ties the latest run, which is what the stable sort of the dict
+    # path would cut first
+    heap = []
+    if TOPN <= 0:
+        return heap
+    for seq, (key, count) in enumerate(sum_runs(lines)):
+        entry = (count, -seq, key)
+        if len(heap) < TOPN:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    heap.sort(key=lambda x: (-x[0], -x[1]))
+    return [(k, c) for c, _, k in heap]
+
+
+def top_items_streaming(stdin):
+    if STREAMING == "trusted":
+        return top_from_sorted(stdin)
+
+    if stdin.seekable():
+        src, spool = stdin, None
+    else:
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY, mode="w+")
+
+        def tee(lines):
+            for line in lines:
+                spool.write(line)
+                yield line
+
+        src = tee(stdin)
 
-counts = {}
-for line in sys.stdin:
-    line = line.strip()
-    if not line:
-        continue
-    key, val = line.split("\t", 1)
     try:
-        counts[key] = counts.get(key, 0) + int(val)
-    except:
-        continue
+        return top_from_sorted(src)
+    except UnsortedInput:
+        sys.stderr.write("reducer_topn_counter_csv: input not sorted, using dict path\n")
+        stats.incr("unsorted_fallback")
+        if spool is None:
+            stdin.seek(0)
+            return top_from_dict(stdin)
+        spool.writelines(stdin)
+        spool.seek(0)
+        return top_from_dict(spool)
+    finally:
+        if spool is not None:
+            spool.close()
+
+
+def read_sketch(lines):
+    # keys are added relative to their summary's min and floor sums the mins
+    # of all summaries, so a key gets the min of each summary without it
+    sketch = SpaceSaving()
+    floor = 0
+    for line in stats.rows(lines, "records_parsed"):
+        line = line.strip()
+        if not line:
+            stats.incr("skipped_blank")
+            continue
+        try:
+            key, c, e, m = parse_record(line)
+        except ValueError:
+            stats.incr("skipped_bad_value")
+            continue
+        if key == MIN_KEY:
+            floor += m
+        else:
+            sketch.add(key, c - m, e - m)
+    return sketch, floor
 
 
-top_items = sorted(counts.items(), key=lambda x: x[1], reverse=True)[:TOPN]
+if APPROX:
+    sketch, floor = read_sketch(sys.stdin)
+    if PARTIAL:
+        # partial summaries are merged by running this reducer again
+        sketch.flush(floor)
+        sys.exit(0)
+    # the floor bounds every salted key on its own, so it is added before the
+    # salt buckets of a key are summed
+    merged = {}
+    for k, (c, e) in sketch.counts.items():
+        entry = merged.setdefault(unsalt(k), [0, 0])
+        entry[0] += c + floor
+        entry[1] += e + floor
+    items = sorted(merged.items())
+    items.sort(key=lambda x: x[1][0], reverse=True)
+    top_items = [(k, c, e) for k, (c, e) in items[:max(TOPN, 0)]]
+elif PARTIAL:
+    # runs that repeat a key are summed again by the merge, so unsorted
+    # input needs no fallback here
+    if STREAMING in ("1", "trusted"):
+        partials = sum_runs(sys.stdin, check_order=False)
+    else:
+        partials = top_from_dict(sys.stdin, limit=None)
+    write = sys.stdout.write
+    for k, c in partials:
+        write(f"{k}\t{c}\n")
+    sys.exit(0)
+elif SQLITE_DB:
+    if STREAMING in ("1", "trusted"):
+        write_counts(SQLITE_DB, SQLITE_TABLE, sum_runs(sys.stdin, check_order=False))
+    else:
+        write_counts(SQLITE_DB, SQLITE_TABLE, top_from_dict(sys.stdin, limit=None))
+    top_items = top(SQLITE_DB, SQLITE_TABLE, TOPN)
+elif STREAMING in ("1", "trusted"):
+    top_items = top_items_streaming(sys.stdin)
+else:
+    top_items = top_from_dict(sys.stdin)
 
 writer = csv.writer(sys.stdout)
-header = os.environ.get("HEADER", "")
+header = csv_header(os.environ.get("HEADER", ""), APPROX_ERROR_COLUMN)
 if header:
-    writer.writerow([h.strip() for h in header.split(",")])
+    writer.writerow(header)
 
-for k, c in top_items:
-    writer.writerow([k, c])
\ No newline at end of file
+for k, c, *err in top_items:
+    # SAMPLE_RATE < 1: counts of the sample scaled to estimates (sampling.py)
+    row = [k, scale(c), *map(scale, err)]
+    writer.writerow(row if APPROX_ERROR_COLUMN else row[:2])
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# Reducer for mapper_word_products.py: sums each word's products and writes
+# one postings line per word, `word\ttotal\t[[product, count], ...]`, with the
+# TOPK products by low-rated reviews (count descending, then name).
+# word_index.py build turns these lines into the memory-mapped index.
+import sys
+import json
+import os
+
+from sampling import scale
+from task_stats import start_task
+
+stats = start_task("reducer_word_products")
+
+TOPK = int(os.environ.get("TOPK", "20"))
+write = sys.stdout.write
+
+
+def flush(word, products):
+    total = sum(products.values())
+    top = sorted(sorted(products.items()), key=lambda x: x[1], reverse=True)[:TOPK]
+    top = [[p, scale(c)] for p, c in top]
+    write(f"{word}\t{scale(total)}\t{json.dumps(top, ensure_ascii=False)}\n")
+
+
+prev, products = None, {}
+for line in stats.rows(sys.stdin, "records_read"):
+    line = line.rstrip("\r\n")
+    if not line:
+        stats.incr("skipped_blank")
+        continue
+    word, _, rest = line.partition("\t")
+    product, _, val = rest.rpartition("\t")
+    try:
+        c = int(val)
+    except ValueError:
+        stats.incr("skipped_bad_value")
+        continue
+    if word != prev:
+        if prev is not None:
+            if word < prev:
+                sys.exit("reducer_word_products: input must be sorted by word")
+            flush(prev, products)
+        prev, products = word, {}
+    products[product] = products.get(product, 0) + c
+if prev is not None:
+    flush(prev, products)
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""Local multi-core runner for the mapreduce/ scripts.
+
+Splits the review CSV into byte-range chunks (never inside a quoted field),
+runs the mapper on every chunk across a process pool, sorts each mapper output
+into spill files, k-way merges them and pipes the result into the reducer.
+
+    TOPN=50 python mapreduce/run_local.py reviews.csv mapper_wordcount.py \
+        reducer_topn_counter_csv.py -o outputs/wordcount.csv
+
+With -r N the keys are hash-partitioned over N reducers running in PARTIAL=1
+mode and merge_partials.py (--merge counter|avg|fused) produces the final CSV,
+or for fused the six files in OUTPUT_DIR.
+
+A gzip/bz2/xz input cannot be split by byte range; it is streamed into a
+single mapper, which decompresses it (stream_io.py). --compress-spills writes
+the sorted runs gzip-compressed (level 1) when the spill disk is the
+bottleneck.
+"""
+import argparse
+import gzip
+import heapq
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from multiprocessing import Pool
+
+from stream_io import sniff
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BLOCK = 4 * 1024 * 1024
+
+
+def resolve_script(name):
+    if os.path.exists(name):
+        return name
+    return os.path.join(HERE, name)
+
+
+def read_header(f):
+    # the header is the first record; keep reading lines while a quote is open
+    header = b""
+    while True:
+        line = f.readline()
+        header += line
+        if not line or header.count(b'"') % 2 == 0:
+            return header
+
+
+def split_chunks(path, chunk_size):
+    """Return (header, [(start, end), ...]) with every boundary on a newline
+    outside quotes, so multi-line `text` fields stay in one chunk."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header = read_header(f)
+        chunk_start = f.tell()
+        chunks = []
+        parity = 0  # quote count mod 2 since chunk_start
+        block_off = chunk_start
+        while True:
+            block = f.read(BLOCK)
+            if not block:
+                break
+            i = 0
+            while i < len(block):
+                t = max(i, chunk_start + chunk_size - block_off)
+                if t >= len(block):
+                    parity ^= block.count(b'"', i) & 1
+                    break
+                parity ^= block.count(b'"', i, t) & 1
+                i = t
+                while True:
+                    nl = block.find(b"\n", i)
+                    if nl < 0:
+                        parity ^= block.count(b'"', i) & 1
+                        i = len(block)
+                        break
+                    parity ^= block.count(b'"', i, nl) & 1
+                    i = nl + 1
+                    if parity == 0:
+                        chunks.append((chunk_start, block_off + i))
+                        chunk_start = block_off + i
+                        break
+            block_off += len(block)
+        if chunk_start < size:
+            chunks.append((chunk_start, size))
+    return header, chunks
+
+
+def partition(line, nparts):
+    return zlib.crc32(line.split(b"\t", 1)[0]) % nparts
+
+
+def is_compressed(path):
+    with open(path, "rb") as f:
+        return sniff(io.BufferedReader(f)) is not None
+
+
+def open_run(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode, compresslevel=1)
+    return open(path, mode)
+
+
+def spill(lines, spill_dir, prefix, part, runs, compress):
+    lines.sort()
+    path = os.path.join(spill_dir, f"{prefix}-p{part:03d}-{len(runs):04d}.run")
+    if compress:
+        path += ".gz"
+    with open_run(path, "wb") as out:
+        out.writelines(lines)
+    runs.append((part, path))
+
+
+def map_chunk(task):
+    path, header, start, end, mapper, spill_dir, idx, sort_buffer, nparts, compress = task
+    if header is None:
+        # whole compressed file, decompressed by the mapper as it streams
+        with open(path, "rb") as f:
+            proc = subprocess.Popen([sys.executable, mapper], stdin=f, stdout=subprocess.PIPE)
+        writer = None
+    else:
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+
+        proc = subprocess.Popen(
+            [sys.executable, mapper], stdin=subprocess.PIPE, stdout=subprocess.PIPE
+        )
+
+        def feed():
+            try:
+                proc.stdin.write(header)
+                proc.stdin.write(data)
+            except BrokenPipeError:
+                pass
+            finally:
+                proc.stdin.close()
+
+        writer = threading.Thread(target=feed)
+        writer.start()
+
+    runs = []
+    bufs = [[] for _ in range(nparts)]
+    for line in proc.stdout:
+        if not line.endswith(b"\n"):
+            line += b"\n"
+        part = partition(line, nparts) if nparts > 1 else 0
+        buf = bufs[part]
+        buf.append(line)
+        if len(buf) >= sort_buffer:
+            spill(buf, spill_dir, f"map{idx:05d}", part, runs, compress)
+            bufs[part] = []
+    for part, buf in enumerate(bufs):
+        if buf:
+            spill(buf, spill_dir, f"map{idx:05d}", part, runs, compress)
+
+    if writer is not None:
+        writer.join()
+    if proc.wait() != 0:
+        raise RuntimeError(f"mapper failed on chunk {idx} ({start}-{end})")
+    return runs
+
+
+def merge_reduce(runs, reducer, out, env=None):
+    files = [open_run(p, "rb") for p in runs]
+    try:
+        proc = subprocess.Popen(
+            [sys.executable, reducer], stdin=subprocess.PIPE, stdout=out, env=env
+        )
+        proc.stdin.writelines(heapq.merge(*files))
+        proc.stdin.close()
+        if proc.wait() != 0:
+            raise RuntimeError("reducer failed")
+    finally:
+        for f in files:
+            f.close()
+
+
+def partitioned_reduce(runs, reducer, nparts, merge_mode, spill_dir, out):
+    env = dict(os.environ, PARTIAL="1")
+    part_files = [os.path.join(spill_dir, f"part-{p:05d}") for p in range(nparts)]
+    errors = []
+
+    def reduce_part(p):
+        try:
+            with open(part_files[p], "wb") as f:
+                merge_reduce([r for q, r in runs if q == p], reducer, f, env)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=reduce_part, args=(p,)) for p in range(nparts)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if errors:
+        raise errors[0]
+
+    merger = os.path.join(HERE, "merge_partials.py")
+    subprocess.run([sys.executable, merger, merge_mode] + part_files, stdout=out, check=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("input", help="review CSV")
+    ap.add_argument("mapper", help="mapper script, e.g. mapper_wordcount.py")
+    ap.add_argument("reducer", help="reducer script, e.g. reducer_topn_counter_csv.py")
+    ap.add_argument("-o", "--output", help="reducer output file (default: stdout)")
+    ap.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--chunk-mb", type=float, default=64, help="max chunk size in MB")
+    ap.add_argument("--sort-buffer", type=int, default=1_000_000,
+                    help="mapper output lines per sorted spill file")
+    ap.add_argument("--tmpdir", help="directory for spill files")
+    ap.add_argument("-r", "--reducers", type=int, default=1,
+                    help="number of partitioned reducers (needs --merge when > 1)")
+    ap.add_argument("--merge", choices=["counter", "avg", "fused"],
+                    help="merge_partials.py mode for the final merge")
+    ap.add_argument("--compress-spills", action="store_true",
+                    help="gzip the sorted spill files")
+    args = ap.parse_args()
+    if args.reducers > 1 and not args.merge:
+        ap.error("--reducers > 1 requires --merge")
+
+    mapper = resolve_script(args.mapper)
+    reducer = resolve_script(args.reducer)
+    t0 = time.perf_counter()
+
+    data_size = max(1, os.path.getsize(args.input))
+    chunk_size = max(1, min(int(args.chunk_mb * 1024 * 1024), -(-data_size // args.workers)))
+    if is_compressed(args.input):
+        header, chunks = None, [(0, data_size)]
+    else:
+        header, chunks = split_chunks(args.input, chunk_size)
+    t1 = time.perf_counter()
+
+    with tempfile.TemporaryDirectory(dir=args.tmpdir, prefix="mr-local-") as spill_dir:
+        tasks = [
+            (args.input, header, s, e, mapper, spill_dir, i, args.sort_buffer, args.reducers,
+             args.compress_spills)
+            for i, (s, e) in enumerate(chunks)
+        ]
+        with Pool(args.workers) as pool:
+            runs = [r for rs in pool.map(map_chunk, tasks, chunksize=1) for r in rs]
+        t2 = time.perf_counter()
+
+        def run_reduce(out):
+            if args.reducers > 1:
+                partitioned_reduce(runs, reducer, args.reducers, args.merge, spill_dir, out)
+            else:
+                merge_reduce([r for _, r in runs], reducer, out)
+
+        if args.output:
+            with open(args.output, "wb") as out:
+                run_reduce(out)
+        else:
+            sys.stdout.flush()
+            run_reduce(sys.stdout.buffer)
+        t3 = time.perf_counter()
+
+    sys.stderr.write(
+        f"split   {t1 - t0:8.3f}s  {len(chunks)} chunks\n"
+        f"map     {t2 - t1:8.3f}s  {len(runs)} sorted runs, {args.workers} workers\n"
+        f"reduce  {t3 - t2:8.3f}s  merge + {os.path.basename(reducer)} x{args.reducers}\n"
+        f"total   {t3 - t0:8.3f}s\n"
+    )
+
+
+if __name__ == "__main__":
+    main()
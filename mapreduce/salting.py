@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Skew salting for hot keys, and the pre-pass that finds them.
+
+    python mapreduce/salting.py outputs/category_count.csv > hot_categories.txt
+    SAMPLE_RATE=0.01 python mapreduce/mapper_wordcount.py < reviews.csv \\
+        | python mapreduce/salting.py > hot_words.txt
+
+Reads a previous run's output CSVs (or, with no arguments, `key\\tcount`
+mapper records on stdin, e.g. from a sampled run) and writes the hot keys one
+per line: the HOT_KEYS_TOP (default 20) largest keys that hold at least
+HOT_KEY_SHARE (default 0.01) of the total.
+
+With SALT_BUCKETS=N and HOT_KEYS=<that file>, mapper_category_count.py,
+mapper_avg_rating_category.py and the word mappers emit every hot key as N
+sub-keys `key<US>0` .. `key<US>N-1` (US = \\x1f) in round-robin, so the
+hash partitioner spreads a hot key over up to N reducers. Run the reducers
+with PARTIAL=1; merge_partials.py strips the salt and writes the usual CSV
+(run_local.py -r R --merge ... does both). A single reducer without PARTIAL=1
+strips it itself.
+"""
+import sys
+import os
+
+from snapshot import read_table
+
+SALT_BUCKETS = int(os.environ.get("SALT_BUCKETS", "0"))
+HOT_KEYS = os.environ.get("HOT_KEYS", "")
+HOT_KEYS_TOP = int(os.environ.get("HOT_KEYS_TOP", "20"))
+HOT_KEY_SHARE = float(os.environ.get("HOT_KEY_SHARE", "0.01"))
+# never produced by the tokenizer and not expected in category names
+SALT_SEP = "\x1f"
+if SALT_BUCKETS > 1 and not HOT_KEYS:
+    sys.exit("SALT_BUCKETS needs HOT_KEYS=<file of hot keys>; see salting.py")
+
+
+def load_hot_keys(path):
+    with open(path, encoding="utf-8") as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+class Salter:
+    def __init__(self, hot, buckets=SALT_BUCKETS):
+        self.buckets = buckets
+        self.next = dict.fromkeys(hot, 0)  # hot key -> next salt
+
+    def salt(self, key):
+        i = self.next.get(key)
+        if i is None:
+            return key
+        self.next[key] = (i + 1) % self.buckets
+        return f"{key}{SALT_SEP}{i}"
+
+    def salt_all(self, keys):
+        hot = self.next
+        return [self.salt(k) if k in hot else k for k in keys]
+
+
+def salter():
+    # None when salting is off, so mappers keep their unsalted fast path
+    if SALT_BUCKETS > 1:
+        return Salter(load_hot_keys(HOT_KEYS))
+    return None
+
+
+def unsalt(key):
+    return key.partition(SALT_SEP)[0]
+
+
+def read_output(path, counts):
+    # any outputs/ table, read the way snapshot.py reads it; counts are in
+    # review_count for avg_rating_category.csv, the second column otherwise
+    columns, _, rows = read_table(path, ["key", "count"])
+    col = columns.index("review_count") if "review_count" in columns else 1
+    for r in rows:
+        if len(r) > col and isinstance(r[col], int):
+            counts[r[0]] = counts.get(r[0], 0) + r[col]
+
+
+def read_records(lines, counts):
+    for line in lines:
+        key, _, val = line.rstrip("\r\n").partition("\t")
+        key = unsalt(key)
+        try:
+            counts[key] = counts.get(key, 0) + int(val)
+        except ValueError:
+            pass
+
+
+def hot_keys(counts, top=HOT_KEYS_TOP, share=HOT_KEY_SHARE):
+    total = sum(counts.values())
+    ranked = sorted(sorted(counts.items()), key=lambda x: x[1], reverse=True)[:top]
+    return [k for k, c in ranked if total and c >= share * total]
+
+
+if __name__ == "__main__":
+    counts = {}
+    if sys.argv[1:]:
+        for path in sys.argv[1:]:
+            read_output(path, counts)
+    else:
+        read_records(sys.stdin, counts)
+    keys = hot_keys(counts)
+    sys.stdout.writelines(f"{k}\n" for k in keys)
+    sys.stderr.write(f"salting: {len(keys)} hot keys of {len(counts)}\n")
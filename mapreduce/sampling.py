@@ -0,0 +1,61 @@
+import math
+import os
+import random
+import sys
+from statistics import NormalDist
+
+# Preview mode: SAMPLE_RATE=0.01 keeps a seeded Bernoulli sample of review
+# records in the mappers (SAMPLE_SEED, default 42), and the final reducers
+# scale counts by 1 / SAMPLE_RATE. avg_rating_category.csv additionally gets
+# ci_low / ci_high columns at CONFIDENCE (default 0.95). Set the same
+# SAMPLE_RATE for every stage; PARTIAL outputs stay unscaled.
+SAMPLE_RATE = float(os.environ.get("SAMPLE_RATE", "1"))
+SAMPLE_SEED = int(os.environ.get("SAMPLE_SEED", "42"))
+CONFIDENCE = float(os.environ.get("CONFIDENCE", "0.95"))
+PREVIEW = SAMPLE_RATE < 1
+if not 0 < SAMPLE_RATE <= 1:
+    sys.exit("SAMPLE_RATE must be in (0, 1]")
+
+
+def sample_lines(lines):
+    """Lines of the header record and of a Bernoulli sample of the records
+    after it. Records are told apart by quote parity, so a multi-line `text`
+    field is kept or dropped whole, and skipped records are never parsed."""
+    if not PREVIEW:
+        return lines
+    return _sample(lines)
+
+
+def _sample(lines):
+    rng = random.Random(SAMPLE_SEED)
+    log_q = math.log1p(-SAMPLE_RATE)
+
+    def gap():
+        # records to skip before the next kept one (geometric), so the RNG
+        # runs once per kept record instead of once per record
+        return int(math.log(1.0 - rng.random()) / log_q)
+
+    keep, skip, odd = True, gap(), 0
+    for line in lines:
+        odd ^= line.count('"') & 1
+        if keep:
+            yield line
+        if not odd:
+            if skip == 0:
+                keep, skip = True, gap()
+            else:
+                keep, skip = False, skip - 1
+
+
+def scale(count):
+    return round(count / SAMPLE_RATE) if PREVIEW else count
+
+
+def mean_ci(hist, count, mean):
+    """Normal-approximation interval for a category mean from its rating
+    histogram; None when the sample is too small for a variance."""
+    if count < 2:
+        return None
+    var = sum(n * (r - mean) ** 2 for r, n in hist.items()) / (count - 1)
+    half = NormalDist().inv_cdf((1 + CONFIDENCE) / 2) * math.sqrt(var / count)
+    return mean - half, mean + half
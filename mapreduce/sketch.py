@@ -0,0 +1,106 @@
+import heapq
+import os
+import sys
+
+# Approximate heavy hitters with a fixed memory budget (Space-Saving, Metwally
+# et al.). Enabled with SKETCH=1 in the word mappers and APPROX=1 in
+# reducer_topn_counter_csv.py; SKETCH_CAPACITY is the number of monitored keys.
+#
+# Every monitored key carries (count, err) with count - err <= true <= count.
+# A full summary also bounds every unmonitored key by its minimum count, so a
+# merged estimate is the sum of the counts of the summaries that hold the key
+# plus the minimums of those that do not. Records are
+# `key\tcount\terr\tmin`, min being their summary's bound, with trailing zero
+# fields left out: a summary that never filled up writes plain `key\tcount`,
+# the exact format. Each summary's min also travels once as a MIN_KEY record;
+# downstream, floor is the sum of those and a key's estimate is
+# sum(count - min) + floor.
+SKETCH = os.environ.get("SKETCH", "0") == "1"
+SKETCH_CAPACITY = int(os.environ.get("SKETCH_CAPACITY", "50000"))
+MIN_KEY = "\x00sketch_min"
+
+
+class SpaceSaving:
+    def __init__(self, capacity=SKETCH_CAPACITY, out=None):
+        self.capacity = max(1, capacity)
+        self.out = out or sys.stdout
+        self.counts = {}  # key -> [count, err]
+        # (count, key) entries; counts only grow, so a stale entry is detected
+        # when popped and pushed back with its current count
+        self.heap = []
+
+    def add(self, key, n=1, err=0):
+        entry = self.counts.get(key)
+        if entry is not None:
+            entry[0] += n
+            entry[1] += err
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[key] = [n, err]
+            heapq.heappush(self.heap, (n, key))
+            return
+        m, victim = self._pop_min()
+        del self.counts[victim]
+        self.counts[key] = [m + n, m + err]
+        heapq.heappush(self.heap, (m + n, key))
+
+    def _pop_min(self):
+        heap, counts = self.heap, self.counts
+        while True:
+            c, key = heapq.heappop(heap)
+            current = counts[key][0]
+            if current == c:
+                return c, key
+            heapq.heappush(heap, (current, key))
+
+    def min_count(self):
+        # bound for any key not monitored; 0 until the summary is full
+        if len(self.counts) < self.capacity:
+            return 0
+        m, key = self._pop_min()
+        heapq.heappush(self.heap, (m, key))
+        return m
+
+    def top(self, n):
+        items = sorted(self.counts.items())
+        items.sort(key=lambda x: x[1][0], reverse=True)
+        return [(k, c, e) for k, (c, e) in items[:max(n, 0)]]
+
+    def flush(self, floor=0):
+        """Emit the summary as records plus its MIN_KEY bound; `floor` is an
+        inherited bound added to everything (see read_sketch in
+        reducer_topn_counter_csv.py)."""
+        write = self.out.write
+        m = self.min_count() + floor
+        if m:
+            write(f"{MIN_KEY}\t0\t0\t{m}\n")
+        for k, (c, e) in self.counts.items():
+            write(format_record(k, c + floor, e + floor, m))
+        self.counts = {}
+        self.heap = []
+
+
+def format_record(key, count, err=0, m=0):
+    if m:
+        return f"{key}\t{count}\t{err}\t{m}\n"
+    if err:
+        return f"{key}\t{count}\t{err}\n"
+    return f"{key}\t{count}\n"
+
+
+def parse_record(line):
+    """(key, count, err, min) from a stripped record; ValueError if malformed."""
+    key, *fields = line.split("\t")
+    if not 1 <= len(fields) <= 3:
+        raise ValueError(line)
+    c, e, m = (list(map(int, fields)) + [0, 0])[:3]
+    return key, c, e, m
+
+
+def csv_header(header, error_column):
+    """Column names from a HEADER value; with the APPROX_ERROR_COLUMN third
+    column an `error` name is added unless HEADER already has three."""
+    names = [h.strip() for h in header.split(",")] if header else []
+    if names and error_column and len(names) == 2:
+        names.append("error")
+    return names
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Publish the dashboard snapshot: every output table in one versioned file.
+
+    python mapreduce/snapshot.py [OUTPUT_DIR]
+
+Reads the outputs/*.csv tables (compressed variants too) and writes
+OUTPUT_DIR/snapshot.json with typed rows and a manifest of versions, row
+counts and generation time. The file is written next to its final name and
+renamed over it, so app.py sees either the previous snapshot or the new one,
+never a mix. A preview run (SAMPLE_RATE < 1, see sampling.py) records its
+rate, seed and confidence level under "sample". reducer_fused_csv.py and incremental.py publish one after every
+run unless SNAPSHOT=0.
+"""
+import sys
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+
+from sampling import CONFIDENCE, PREVIEW, SAMPLE_RATE, SAMPLE_SEED
+from stream_io import SUFFIXES, atomic_write, decompressing
+
+SNAPSHOT = os.environ.get("SNAPSHOT", "1") == "1"
+SNAPSHOT_NAME = "snapshot.json"
+FORMAT = 1
+
+# table -> column names for files written without a header
+TABLES = {
+    "wordcount": ["word", "count"],
+    "positive_words": ["word", "count"],
+    "negative_words": ["word", "count"],
+    "category_count": ["category", "review_count"],
+    "avg_rating_category": ["category", "avg_rating", "review_count"],
+    "problem_products": ["product_name", "negative_review_count"],
+    "negative_bigrams": ["phrase", "count"],
+}
+
+
+def find_table(out_dir, name):
+    # newest of name.csv and its compressed variants, as app.py picks them
+    paths = [os.path.join(out_dir, name + ".csv" + s) for s in ("", *SUFFIXES.values())]
+    paths = [p for p in paths if os.path.exists(p)]
+    return max(paths, key=os.path.getmtime, default=None)
+
+
+def parses(values, kind):
+    try:
+        for v in values:
+            kind(v)
+    except ValueError:
+        return False
+    return True
+
+
+def read_table(path, default_columns):
+    with open(path, "rb") as f:
+        text = io.TextIOWrapper(decompressing(f), encoding="utf-8", newline="")
+        # files copied back from HDFS carry a trailing tab per line and blank
+        # lines; neither is data
+        rows = [[v.strip() for v in r] for r in csv.reader(text)]
+    rows = [r for r in rows if any(r)]
+    if rows and len(rows[0]) > 1 and not parses(rows[0][1:2], float):
+        columns, rows = rows[0], rows[1:]
+    else:
+        columns = default_columns
+    # the key column stays text ("123" is a product name); the rest are int,
+    # float or str, whichever fits every value
+    dtypes = ["str"]
+    for i in range(1, len(columns)):
+        values = [r[i] for r in rows if len(r) > i and r[i] != ""]
+        dtypes.append("int" if parses(values, int) else "float" if parses(values, float) else "str")
+    cast = {"int": int, "float": float, "str": str}
+    typed = [
+        [cast[t](v) if v != "" else None for t, v in zip(dtypes, r)]
+        for r in rows
+    ]
+    return columns, dtypes, typed
+
+
+def publish(out_dir):
+    """Bundle the tables found in out_dir into out_dir/snapshot.json and
+    return the new version."""
+    tables, manifest = {}, {}
+    for name, default_columns in TABLES.items():
+        path = find_table(out_dir, name)
+        if path is None:
+            continue
+        columns, dtypes, rows = read_table(path, default_columns)
+        tables[name] = rows
+        manifest[name] = {"columns": columns, "dtypes": dtypes, "rows": len(rows),
+                          "source": os.path.basename(path)}
+
+    sample = {"rate": SAMPLE_RATE, "seed": SAMPLE_SEED, "confidence": CONFIDENCE} if PREVIEW else None
+    digest = hashlib.sha1(json.dumps([manifest, tables, sample], sort_keys=True).encode("utf-8")).hexdigest()
+    now = time.gmtime()
+    version = time.strftime("%Y%m%dT%H%M%SZ", now) + "-" + digest[:8]
+    doc = {
+        "format": FORMAT,
+        "version": version,
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", now),
+        "sample": sample,
+        "manifest": manifest,
+        "tables": tables,
+    }
+
+    with atomic_write(os.path.join(out_dir, SNAPSHOT_NAME), "w", encoding="utf-8") as f:
+        json.dump(doc, f, ensure_ascii=False, separators=(",", ":"))
+    counts = ", ".join(f"{k} {v['rows']}" for k, v in manifest.items())
+    sys.stderr.write(f"snapshot {version}: {counts}\n")
+    return version
+
+
+if __name__ == "__main__":
+    publish(sys.argv[1] if len(sys.argv) > 1 else os.environ.get("OUTPUT_DIR", "outputs"))
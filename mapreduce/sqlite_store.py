@@ -0,0 +1,56 @@
+import sqlite3
+
+# Full (untruncated) counter results in a local SQLite file. Each job gets one
+# table; the WITHOUT ROWID primary key on `key` doubles as the prefix index
+# (range scans for key >= p AND key < p + U+10FFFF), and `<table>_count`
+# serves ORDER BY count DESC pagination.
+
+PREFIX_END = "\U0010ffff"
+
+
+def _name(table):
+    if not table.replace("_", "").isalnum():
+        raise ValueError(f"bad table name: {table!r}")
+    return table
+
+
+def write_counts(db_path, table, items, batch=50_000):
+    """Replace `table` with the (key, count) pairs in `items`; repeated keys
+    are summed, so unsorted partial runs can be written directly."""
+    t = _name(table)
+    con = sqlite3.connect(db_path)
+    try:
+        con.execute("PRAGMA journal_mode=WAL")
+        with con:
+            con.execute(f"DROP TABLE IF EXISTS {t}")
+            con.execute(
+                f"CREATE TABLE {t} (key TEXT PRIMARY KEY, count INTEGER NOT NULL) WITHOUT ROWID"
+            )
+            sql = (
+                f"INSERT INTO {t} (key, count) VALUES (?, ?) "
+                f"ON CONFLICT(key) DO UPDATE SET count = count + excluded.count"
+            )
+            buf = []
+            for kv in items:
+                buf.append(kv)
+                if len(buf) >= batch:
+                    con.executemany(sql, buf)
+                    buf = []
+            if buf:
+                con.executemany(sql, buf)
+            con.execute(f"CREATE INDEX {t}_count ON {t} (count DESC, key)")
+    finally:
+        con.close()
+
+
+def top(db_path, table, n):
+    # BINARY collation orders keys by code point, so ties come out in the same
+    # order as the reducer over sorted shuffle input
+    t = _name(table)
+    con = sqlite3.connect(db_path)
+    try:
+        return con.execute(
+            f"SELECT key, count FROM {t} ORDER BY count DESC, key LIMIT ?", (max(n, 0),)
+        ).fetchall()
+    finally:
+        con.close()
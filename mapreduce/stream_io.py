@@ -0,0 +1,271 @@
+import atexit
+import bz2
+import contextlib
+import gzip
+import io
+import lzma
+import os
+import sys
+import tempfile
+
+from tokenizer import BATCH_ROWS, tokenize_batch
+
+# Shared stdio layer for the mapreduce/ scripts; task_stats.start_task() calls
+# reopen_stdio(). sys.stdin and sys.stdout are re-opened on the same file
+# descriptors with IO_BUFFER-byte buffers (and the same encoding and newline
+# handling), so csv.reader pulls large blocks and output leaves in a few big
+# write() calls instead of one per record. Mappers emit through Emitter, which
+# skips print() and writes a batch of keys with a single join; review text goes
+# through Emitter.emit_text(), which tokenizes it BATCH_ROWS rows at a time.
+#
+# gzip / bz2 / xz input is detected from its magic bytes and decompressed as it
+# streams. OUTPUT_COMPRESSION=gzip|bz2|xz compresses stdout, and the files
+# written with open_output_file() get the matching suffix. Inside a Hadoop
+# task stdout is left uncompressed: TextOutputFormat re-frames it by newline
+# and appends a tab, which would corrupt the stream. Cluster jobs compress
+# their part files with -D mapreduce.output.fileoutputformat.compress=true
+# (and .compress.codec) instead.
+IO_BUFFER = int(os.environ.get("IO_BUFFER", str(1024 * 1024)))
+OUTPUT_COMPRESSION = os.environ.get("OUTPUT_COMPRESSION", "")
+
+# gzip with deflate; bzip2 header plus its first block magic (pi), so a
+# record that merely starts with "BZh" is not taken for bz2
+MAGIC = ((b"\x1f\x8b\x08", "gzip"), (b"\xfd7zXZ\x00", "xz"))
+BZ2_BLOCK = b"1AY&SY"
+SUFFIXES = {"gzip": ".gz", "bz2": ".bz2", "xz": ".xz"}
+OPENERS = {"gzip": gzip.open, "bz2": bz2.open, "xz": lzma.open}
+if OUTPUT_COMPRESSION and OUTPUT_COMPRESSION not in SUFFIXES:
+    sys.exit(f"OUTPUT_COMPRESSION must be one of {', '.join(SUFFIXES)}")
+
+
+class CountingRaw(io.RawIOBase):
+    # under the stdout buffer, so it sees flushed blocks, not every record
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes = 0
+        self.lines = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        n = self.raw.write(b)
+        if n:
+            b = bytes(b[:n])
+            self.bytes += n
+            self.lines += b.count(b"\n")
+        return n
+
+
+def sniff(buffered):
+    head = buffered.peek(10)[:10]
+    for magic, kind in MAGIC:
+        if head.startswith(magic):
+            return kind
+    if head[:3] == b"BZh" and head[3:4].isdigit() and head[4:] == BZ2_BLOCK:
+        return "bz2"
+    return None
+
+
+def decompressing(buffered):
+    kind = sniff(buffered)
+    if kind == "gzip":
+        return gzip.GzipFile(fileobj=buffered, mode="rb")
+    if kind == "bz2":
+        return bz2.BZ2File(buffered, "rb")
+    if kind == "xz":
+        return lzma.LZMAFile(buffered, "rb")
+    return buffered
+
+
+class _AutoDecompress(io.BufferedIOBase):
+    # sniffs on the first read, not at start-up: peeking would block scripts
+    # that never read an inherited stdin
+    def __init__(self, buffered):
+        self.src = buffered
+        self.f = None
+
+    def stream(self):
+        if self.f is None:
+            self.f = decompressing(self.src)
+        return self.f
+
+    def readable(self):
+        return True
+
+    def read(self, n=-1):
+        return self.stream().read(n)
+
+    def read1(self, n=-1):
+        return self.stream().read1(n)
+
+    def readinto(self, b):
+        return self.stream().readinto(b)
+
+    def seekable(self):
+        return self.src.seekable()
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        return self.stream().seek(pos, whence)
+
+    def tell(self):
+        return self.stream().tell()
+
+    def fileno(self):
+        return self.src.fileno()
+
+
+def compressing(raw, kind):
+    if kind == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode="wb", mtime=0)
+    if kind == "bz2":
+        return bz2.BZ2File(raw, "wb")
+    return lzma.LZMAFile(raw, "wb")
+
+
+class _LazyCompressor(io.RawIOBase):
+    # starts the compressed stream on the first write, so a script that
+    # writes nothing to stdout (reducer_fused_csv.py) leaves it empty
+    def __init__(self, raw, kind):
+        self.raw = raw
+        self.kind = kind
+        self.f = None
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        if self.f is None:
+            self.f = compressing(self.raw, self.kind)
+        return self.f.write(b)
+
+    def finish(self):
+        if self.f is not None:
+            self.f.close()
+
+
+def open_output_file(path):
+    """Text file for a CSV output, compressed per OUTPUT_COMPRESSION."""
+    if OUTPUT_COMPRESSION:
+        return OPENERS[OUTPUT_COMPRESSION](path + SUFFIXES[OUTPUT_COMPRESSION], "wt", newline="")
+    return open(path, "w", newline="")
+
+
+@contextlib.contextmanager
+def atomic_write(path, mode="wb", **kwargs):
+    """File object for path, written next to it and renamed over it on
+    success, so a reader sees the old file or the new one, never a mix."""
+    out_dir = os.path.dirname(os.path.abspath(path))
+    os.makedirs(out_dir, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=out_dir, prefix=f".{os.path.basename(path)}-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            # mkstemp creates the file 0600 and os.replace keeps that; give it
+            # the mode open() would, so a dashboard running as another user
+            # can read it like the CSVs
+            umask = os.umask(0)
+            os.umask(umask)
+            os.fchmod(f.fileno(), 0o666 & ~umask)
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+# what the interpreter passes for its own stdio: lines split at "\n" and
+# written untranslated, except on Windows (universal newlines / "\r\n").
+# TextIOWrapper's default of newline=None would fold a "\r" inside a quoted
+# field into "\n" on read.
+STDIO_NEWLINE = None if os.name == "nt" else "\n"
+
+
+def _text(buffer, like):
+    f = io.TextIOWrapper(buffer, encoding=like.encoding, errors=like.errors, newline=STDIO_NEWLINE)
+    f._CHUNK_SIZE = IO_BUFFER  # decode / encode in IO_BUFFER-sized chunks too
+    return f
+
+
+def reopen_stdio(count_output=False, in_task=False):
+    """Swap in large-buffer stdin/stdout; returns the CountingRaw under stdout
+    when count_output is set. in_task: running as a Hadoop task."""
+    if sys.stdin is not None:
+        raw = io.FileIO(sys.stdin.fileno(), "rb", closefd=False)
+        sys.stdin = _text(_AutoDecompress(io.BufferedReader(raw, IO_BUFFER)), sys.stdin)
+    counter = None
+    old = sys.stdout
+    old.flush()
+    raw = io.FileIO(old.fileno(), "wb", closefd=False)
+    if OUTPUT_COMPRESSION and in_task:
+        sys.stderr.write("OUTPUT_COMPRESSION ignored for stdout in a Hadoop task; "
+                         "use mapreduce.output.fileoutputformat.compress\n")
+    elif OUTPUT_COMPRESSION:
+        raw = compressor = _LazyCompressor(raw, OUTPUT_COMPRESSION)
+        atexit.register(_close_stdout, compressor)
+    if count_output:
+        # above the compressor: counts are of the uncompressed records
+        raw = counter = CountingRaw(raw)
+    sys.stdout = _text(io.BufferedWriter(raw, IO_BUFFER), old)
+    return counter
+
+
+def _close_stdout(compressor):
+    # the compressed stream needs its trailer; interpreter shutdown only
+    # flushes sys.stdout
+    try:
+        sys.stdout.flush()
+        compressor.finish()
+    except BrokenPipeError:
+        pass
+
+
+class Emitter:
+    def __init__(self, out=None, counter=None, salting=None, stats=None):
+        self.write = (out or sys.stdout).write
+        # for review text: tokens go to counter (LocalCounter / SpaceSaving)
+        # when one is given, are salted by a salting.Salter and counted in
+        # stats as tokens / tokens_<tag>
+        self.counter = counter
+        self.salting = salting
+        self.stats = stats
+        self.texts = {}  # prefix -> texts not tokenized yet
+
+    def emit(self, key, value=1):
+        self.write(f"{key}\t{value}\n")
+
+    def emit_ones(self, keys, prefix=""):
+        # `<prefix><key>\t1` for every key, in one write
+        if keys:
+            self.write(prefix + f"\t1\n{prefix}".join(keys) + "\t1\n")
+
+    def emit_text(self, text, prefix=""):
+        # buffered, and tokenized BATCH_ROWS texts at a time
+        texts = self.texts.setdefault(prefix, [])
+        texts.append(text)
+        if len(texts) >= BATCH_ROWS:
+            self.emit_tokens(texts, prefix)
+            texts.clear()
+
+    def emit_tokens(self, texts, prefix=""):
+        # `<prefix><token>\t1` for every token of texts
+        words = tokenize_batch(texts)
+        if self.stats is not None:
+            self.stats.incr(f"tokens_{prefix.rstrip(':')}" if prefix else "tokens", len(words))
+        if self.salting is not None:
+            words = self.salting.salt_all(words)
+        if self.counter is None:
+            self.emit_ones(words, prefix)
+            return
+        add = self.counter.add
+        for w in words:
+            add(prefix + w)
+
+    def flush(self):
+        # the buffered texts, then the counter; call once at the end
+        for prefix, texts in self.texts.items():
+            self.emit_tokens(texts, prefix)
+            texts.clear()
+        if self.counter is not None:
+            self.counter.flush()
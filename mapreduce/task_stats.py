@@ -0,0 +1,145 @@
+import atexit
+import os
+import sys
+import tempfile
+import time
+
+from stream_io import reopen_stdio
+
+# Task instrumentation for the mapreduce/ scripts. Call start_task() before
+# anything captures sys.stdin or sys.stdout; it also sets up the large-buffer
+# stdio of stream_io.py.
+#
+# COUNTERS=1 reports Hadoop streaming counters at exit as
+# `reporter:counter:<script>,<name>,<n>` lines on stderr: rows/records read,
+# skips by reason, records and bytes written to stdout, task and CPU time.
+# They are on by default inside a Hadoop task (mapreduce_task_id is set) and
+# off otherwise.
+#
+# PROFILE=cprofile|sample profiles the whole task and writes one file per task
+# to PROFILE_DIR (default: the temp dir); the path and a short summary go to
+# stderr so they end up in the task log. cprofile writes a pstats .prof file;
+# sample interrupts every PROFILE_INTERVAL seconds of CPU time and writes
+# collapsed stacks (.folded) for flamegraph.pl / speedscope.
+TASK_ID = os.environ.get("mapreduce_task_attempt_id") or os.environ.get("mapreduce_task_id") \
+    or os.environ.get("mapred_task_id", "")
+COUNTERS = os.environ.get("COUNTERS", "1" if TASK_ID else "0") == "1"
+PROFILE = os.environ.get("PROFILE", "")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "")
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL", "0.005"))
+PROFILE_TOP = 25
+
+
+class TaskStats:
+    def __init__(self, group):
+        self.group = group
+        self.counts = {}
+        self.out = None
+        self.t0 = time.perf_counter()
+        self.cpu0 = time.process_time()
+
+    def incr(self, name, n=1):
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def rows(self, rows, name="rows_read"):
+        # pass-through when nothing reports, so the hot loop pays nothing
+        if not COUNTERS:
+            return rows
+        return self._count(rows, name)
+
+    def _count(self, rows, name):
+        n = 0
+        try:
+            for row in rows:
+                n += 1
+                yield row
+        finally:
+            self.incr(name, n)
+
+    def report(self):
+        try:
+            sys.stdout.flush()
+        except (BrokenPipeError, ValueError):
+            pass
+        counts = dict(self.counts)
+        if self.out is not None:
+            counts["records_written"] = self.out.lines
+            counts["bytes_written"] = self.out.bytes
+        counts["task_ms"] = int((time.perf_counter() - self.t0) * 1000)
+        counts["cpu_ms"] = int((time.process_time() - self.cpu0) * 1000)
+        write = sys.stderr.write
+        for name, n in counts.items():
+            write(f"reporter:counter:{self.group},{name},{n}\n")
+
+
+def _profile_path(group, ext):
+    d = PROFILE_DIR or tempfile.gettempdir()
+    os.makedirs(d, exist_ok=True)
+    return os.path.join(d, f"{group}-{TASK_ID or os.getpid()}.{ext}")
+
+
+def _start_cprofile(group):
+    import cProfile
+    import pstats
+
+    prof = cProfile.Profile()
+
+    def dump():
+        prof.disable()
+        path = _profile_path(group, "prof")
+        prof.dump_stats(path)
+        sys.stderr.write(f"{group}: profile written to {path}\n")
+        pstats.Stats(prof, stream=sys.stderr).sort_stats("cumulative").print_stats(PROFILE_TOP)
+
+    prof.enable()
+    return dump
+
+
+def _start_sampler(group):
+    import signal
+
+    stacks = {}
+
+    def sample(signum, frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        key = ";".join(reversed(names))
+        stacks[key] = stacks.get(key, 0) + 1
+
+    def dump():
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        path = _profile_path(group, "folded")
+        with open(path, "w") as f:
+            for key, n in sorted(stacks.items()):
+                f.write(f"{key} {n}\n")
+        total = sum(stacks.values()) or 1
+        leaves = {}
+        for key, n in stacks.items():
+            leaf = key.rsplit(";", 1)[-1]
+            leaves[leaf] = leaves.get(leaf, 0) + n
+        sys.stderr.write(f"{group}: {total} samples written to {path}\n")
+        for leaf, n in sorted(leaves.items(), key=lambda x: x[1], reverse=True)[:PROFILE_TOP]:
+            sys.stderr.write(f"{100 * n / total:6.1f}%  {leaf}\n")
+
+    signal.signal(signal.SIGPROF, sample)
+    signal.setitimer(signal.ITIMER_PROF, PROFILE_INTERVAL, PROFILE_INTERVAL)
+    return dump
+
+
+PROFILERS = {"cprofile": _start_cprofile, "sample": _start_sampler}
+
+
+def start_task(group):
+    stats = TaskStats(group)
+    stats.out = reopen_stdio(count_output=COUNTERS, in_task=bool(TASK_ID))
+    if COUNTERS:
+        # registered first so it runs last, after the profile is dumped
+        atexit.register(stats.report)
+    if PROFILE in PROFILERS:
+        atexit.register(PROFILERS[PROFILE](group))
+    elif PROFILE:
+        sys.stderr.write(f"{group}: unknown PROFILE={PROFILE}, expected one of {', '.join(PROFILERS)}\n")
+    return stats
@@ -0,0 +1,51 @@
+import re
+
+# Shared tokenizer for the text mappers. Same rules as the original inline
+# code: lowercase, anything outside [a-z\s] becomes a space, split on
+# whitespace, keep words longer than 2 characters.
+MIN_LEN = 3
+# rows joined per tokenize_batch() call in the mappers
+BATCH_ROWS = 512
+
+_NON_ALPHA = re.compile(r'[^a-z\s]')
+
+# ASCII fast path: one bytes.translate does lowercasing and the character
+# filter. Whitespace maps to a space too, which splits the same way.
+_ASCII_TABLE = bytes(
+    c + 32 if 65 <= c <= 90 else c if 97 <= c <= 122 else 32
+    for c in range(256)
+)
+
+
+def tokenize_slow(text):
+    # reference implementation, also used for non-ASCII text where lower()
+    # and \s have Unicode semantics
+    return [w for w in _NON_ALPHA.sub(' ', text.lower()).split() if len(w) >= MIN_LEN]
+
+
+def _ascii_words(text):
+    text = text.encode("ascii").translate(_ASCII_TABLE).decode("ascii")
+    return [w for w in text.split() if len(w) >= MIN_LEN]
+
+
+def tokenize(text):
+    if text.isascii():
+        return _ascii_words(text)
+    return tokenize_slow(text)
+
+
+def tokenize_batch(texts):
+    # same tokens as tokenize() over texts: each run of ASCII rows is joined
+    # with spaces (which keep words from different rows apart) and translated
+    # as one block; a non-ASCII row ends the run and takes the regex path alone
+    words = []
+    start = 0
+    for i, t in enumerate(texts):
+        if not t.isascii():
+            if start < i:
+                words += _ascii_words(" ".join(texts[start:i]))
+            words += tokenize_slow(t)
+            start = i + 1
+    if start < len(texts):
+        words += _ascii_words(" ".join(texts[start:]))
+    return words
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Compact inverted index of complaint words to products.
+
+    python mapreduce/mapper_word_products.py < reviews.csv | LC_ALL=C sort \\
+        | python mapreduce/reducer_word_products.py \\
+        | python mapreduce/word_index.py build outputs/word_products.idx
+    python mapreduce/word_index.py query outputs/word_products.idx rusak
+
+`build` reads the postings lines of reducer_word_products.py (stdin or the
+files given, e.g. every part-* of a multi-reducer job) and writes one binary
+file. It is sorted by word, so a reader memory-maps it and binary-searches a
+word in O(log n) page reads without loading the rest:
+
+    header    8s magic, u32 words, u32 top_k, u64 postings offset,
+              u64 strings offset
+    entries   per word, sorted by UTF-8 bytes: u32 word offset, u32 word
+              length, u32 total, u32 first posting, u32 postings
+    postings  per product, count descending: u32 product offset, u32 product
+              length, u32 count
+    strings   UTF-8 words and product names, each product stored once
+
+`total` is the number of low-rated reviews containing the word; the postings
+are its top_k products by such reviews. Written next to its final name and
+renamed over it, like snapshot.py. app.py looks words up through WordIndex.
+"""
+import sys
+import fileinput
+import json
+import mmap
+import struct
+
+from stream_io import atomic_write
+
+MAGIC = b"WPIDX\x00\x00\x01"
+HEADER = struct.Struct("<8sIIQQ")
+ENTRY = struct.Struct("<IIIII")
+POSTING = struct.Struct("<III")
+
+
+def read_postings(lines):
+    # `word\ttotal\t[[product, count], ...]` -> word, total, postings
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line:
+            continue
+        word, total, postings = line.split("\t", 2)
+        yield word, int(total), json.loads(postings)
+
+
+def build(path, words):
+    """Write the index for (word, total, [(product, count), ...]) items."""
+    words = sorted(words, key=lambda w: w[0].encode("utf-8"))
+    strings = bytearray()
+    offsets = {}  # product -> (offset, length) in strings
+
+    def intern(text):
+        if text not in offsets:
+            b = text.encode("utf-8")
+            offsets[text] = (len(strings), len(b))
+            strings.extend(b)
+        return offsets[text]
+
+    entries, postings, top_k = bytearray(), bytearray(), 0
+    n_postings = 0
+    for word, total, items in words:
+        b = word.encode("utf-8")
+        entries += ENTRY.pack(len(strings), len(b), total, n_postings, len(items))
+        strings.extend(b)
+        for product, count in items:
+            postings += POSTING.pack(*intern(product), count)
+        n_postings += len(items)
+        top_k = max(top_k, len(items))
+
+    postings_off = HEADER.size + len(entries)
+    strings_off = postings_off + len(postings)
+    with atomic_write(path) as f:
+        f.write(HEADER.pack(MAGIC, len(words), top_k, postings_off, strings_off))
+        f.write(entries)
+        f.write(postings)
+        f.write(strings)
+    sys.stderr.write(f"word_index: {len(words)} words, {n_postings} postings, "
+                     f"{strings_off + len(strings)} bytes -> {path}\n")
+
+
+class WordIndex:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.n, self.top_k, self.postings_off, self.strings_off = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a word index")
+
+    def _string(self, off, length):
+        start = self.strings_off + off
+        return self.mm[start:start + length]
+
+    def _entry(self, i):
+        return ENTRY.unpack_from(self.mm, HEADER.size + i * ENTRY.size)
+
+    def lookup(self, word):
+        """(total, [(product, count), ...]) for word; (0, []) when absent."""
+        target = word.encode("utf-8")
+        lo, hi = 0, self.n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            off, length, total, first, count = self._entry(mid)
+            w = self._string(off, length)
+            if w < target:
+                lo = mid + 1
+            elif w > target:
+                hi = mid
+            else:
+                items = []
+                for j in range(first, first + count):
+                    p_off, p_len, c = POSTING.unpack_from(self.mm, self.postings_off + j * POSTING.size)
+                    items.append((self._string(p_off, p_len).decode("utf-8"), c))
+                return total, items
+        return 0, []
+
+    def close(self):
+        self.mm.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "build":
+        with fileinput.input(sys.argv[3:]) as lines:
+            build(sys.argv[2], read_postings(lines))
+    elif len(sys.argv) == 4 and sys.argv[1] == "query":
+        index = WordIndex(sys.argv[2])
+        total, items = index.lookup(sys.argv[3])
+        print(f"{sys.argv[3]}: {total} low-rated reviews")
+        for product, count in items:
+            print(f"{count:>8} {product}")
+    else:
+        sys.exit(f"usage: {sys.argv[0]} build INDEX [postings files...] | query INDEX WORD")
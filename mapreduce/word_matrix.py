@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""Per-category word frequency matrix in CSR form.
+
+    python mapreduce/mapper_category_words.py < reviews.csv | LC_ALL=C sort \\
+        | python mapreduce/reducer_category_words.py \\
+        | python mapreduce/word_matrix.py build outputs/category_words.wcm
+
+`build` reads the lines of reducer_category_words.py (stdin or the files
+given, e.g. every part-* of a multi-reducer job) and writes one binary file.
+There is one row per (category, rating) pair, so a reader can pick a
+category, a rating range or both by choosing rows, and one column per word.
+After the header (8s magic, u32 rows, u32 words, u32 categories, u64 nnz,
+u64 vocab bytes, u64 category bytes) come these arrays, little-endian, each
+starting on an 8-byte boundary so they can be memory-mapped in place:
+
+    indptr            int64 [rows + 1]       row r is indices/data[indptr[r]:indptr[r+1]]
+    indices           int32 [nnz]            word ids, ascending within a row
+    data              int64 [nnz]            token counts
+    row_category      int32 [rows]           index into categories
+    row_rating        int16 [rows]
+    vocab_offsets     int64 [words + 1]      word i is vocab_blob[offsets[i]:offsets[i+1]]
+    category_offsets  int64 [categories + 1]
+    vocab_blob        UTF-8, words sorted
+    category_blob     UTF-8, categories sorted
+
+Strings are stored as a blob plus offsets, like the dictionaries of
+columnar.py, so one long token does not widen every entry. Written next to
+its final name and renamed over it, like snapshot.py. app.py reads it through
+WordMatrix and only touches the rows a filter selects.
+"""
+import sys
+import fileinput
+import json
+import struct
+
+import numpy as np
+
+from stream_io import atomic_write
+
+MAGIC = b"WCMTX\x00\x00\x01"
+HEADER = struct.Struct("<8sIIIQQQ")
+RATING_RANGE = (np.iinfo(np.int16).min, np.iinfo(np.int16).max)
+
+
+def layout(rows, words, categories, nnz, vocab_bytes, category_bytes):
+    """[(name, dtype, count, offset), ...] of the arrays after the header."""
+    arrays = [
+        ("indptr", "<i8", rows + 1),
+        ("indices", "<i4", nnz),
+        ("data", "<i8", nnz),
+        ("row_category", "<i4", rows),
+        ("row_rating", "<i2", rows),
+        ("vocab_offsets", "<i8", words + 1),
+        ("category_offsets", "<i8", categories + 1),
+        ("vocab_blob", "u1", vocab_bytes),
+        ("category_blob", "u1", category_bytes),
+    ]
+    out, off = [], HEADER.size
+    for name, dtype, count in arrays:
+        off = -(-off // 8) * 8
+        out.append((name, dtype, count, off))
+        off += count * np.dtype(dtype).itemsize
+    return out
+
+
+def pack_strings(strings):
+    blobs = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in blobs], out=offsets[1:])
+    return np.frombuffer(b"".join(blobs), dtype=np.uint8), offsets
+
+
+def read_cells(lines):
+    # `word\t[[category, rating, count], ...]` -> word, cells
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line:
+            word, _, cells = line.partition("\t")
+            yield word, json.loads(cells)
+
+
+def build(path, items):
+    items = sorted(items, key=lambda x: x[0])
+    lo, hi = RATING_RANGE
+    dropped = 0
+    for _, cells in items:
+        # ratings are ints from the mapper but unchecked; out-of-range ones
+        # cannot be stored in row_rating
+        n = len(cells)
+        cells[:] = [c for c in cells if lo <= c[1] <= hi]
+        dropped += n - len(cells)
+    vocab = [w for w, _ in items]
+    row_keys = sorted({(cat, rating) for _, cells in items for cat, rating, _ in cells})
+    row_of = {k: i for i, k in enumerate(row_keys)}
+    categories = sorted({cat for cat, _ in row_keys})
+    cat_of = {c: i for i, c in enumerate(categories)}
+
+    rows, cols, data = [], [], []
+    for col, (_, cells) in enumerate(items):
+        for cat, rating, count in cells:
+            rows.append(row_of[cat, rating])
+            cols.append(col)
+            data.append(count)
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int32)
+    data = np.asarray(data, dtype=np.int64)
+    order = np.lexsort((cols, rows))
+    indptr = np.zeros(len(row_keys) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(row_keys)), out=indptr[1:])
+    vocab_blob, vocab_offsets = pack_strings(vocab)
+    category_blob, category_offsets = pack_strings(categories)
+
+    arrays = {
+        "indptr": indptr,
+        "indices": cols[order],
+        "data": data[order],
+        "row_category": np.asarray([cat_of[c] for c, _ in row_keys], dtype=np.int32),
+        "row_rating": np.asarray([r for _, r in row_keys], dtype=np.int16),
+        "vocab_offsets": vocab_offsets,
+        "category_offsets": category_offsets,
+        "vocab_blob": vocab_blob,
+        "category_blob": category_blob,
+    }
+    sizes = (len(row_keys), len(vocab), len(categories), len(data), len(vocab_blob), len(category_blob))
+    with atomic_write(path) as f:
+        f.write(HEADER.pack(MAGIC, *sizes))
+        pos = HEADER.size
+        for name, dtype, count, off in layout(*sizes):
+            f.write(b"\0" * (off - pos))
+            b = arrays[name].astype(dtype, copy=False).tobytes()
+            f.write(b)
+            pos = off + len(b)
+    if dropped:
+        sys.stderr.write(f"word_matrix: dropped {dropped} cells with a rating outside {lo}..{hi}\n")
+    sys.stderr.write(f"word_matrix: {len(row_keys)} rows x {len(vocab)} words, "
+                     f"{len(data)} non-zeros, {pos} bytes -> {path}\n")
+
+
+def _decode(blob, offsets, ids):
+    return [bytes(blob[offsets[i]:offsets[i + 1]]).decode("utf-8") for i in ids]
+
+
+class WordMatrix:
+    def __init__(self, path):
+        buf = np.memmap(path, dtype=np.uint8, mode="r")
+        if len(buf) < HEADER.size:
+            raise ValueError(f"{path}: not a word matrix")
+        magic, *sizes = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a word matrix")
+        for name, dtype, count, off in layout(*sizes):
+            end = off + count * np.dtype(dtype).itemsize
+            if end > len(buf):
+                raise ValueError(f"{path}: truncated")
+            setattr(self, name, buf[off:end].view(dtype))
+        self.n_words = sizes[1]
+        # a handful of names; the vocabulary is decoded per lookup
+        self.categories = _decode(self.category_blob, self.category_offsets, range(sizes[2]))
+
+    def words(self, ids):
+        return _decode(self.vocab_blob, self.vocab_offsets, ids)
+
+    def word_counts(self, rows):
+        """Token count per word, summed over the rows a boolean mask selects."""
+        out = np.zeros(self.n_words, dtype=np.int64)
+        for r in np.flatnonzero(rows):
+            lo, hi = self.indptr[r], self.indptr[r + 1]
+            # word ids are unique within a row
+            out[self.indices[lo:hi]] += self.data[lo:hi]
+        return out
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "build":
+        with fileinput.input(sys.argv[3:]) as lines:
+            build(sys.argv[2], read_cells(lines))
+    else:
+        sys.exit(f"usage: {sys.argv[0]} build MATRIX [reducer output files...]")